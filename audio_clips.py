@@ -0,0 +1,322 @@
+import bisect
+import os
+import re
+import shutil
+import subprocess
+import tempfile
+
+import numpy as np
+from pydub.utils import mediainfo
+
+# An MP3 frame holds 1152 samples per channel.
+FRAME_SAMPLES = 1152
+# Silence encoded after every clip, in frames. It has to be longer than the encoder delay
+# (about 1105 samples for LAME), which shifts the cut points of the segment muxer, so that every
+# clip only ever picks up silence from its neighbours.
+GUARD_FRAMES = 2
+
+# How ffmpeg describes the decoded output stream, e.g. "Audio: pcm_s16le, 44100 Hz, stereo, s16".
+OUTPUT_STREAM = re.compile(r'Audio: pcm_s16le.*?, (\d+) Hz, (mono|stereo|(\d+) channels)')
+
+
+class EpisodeAudio:
+    """An episode decoded once to 16-bit PCM, held as a numpy array of shape (samples, channels)."""
+
+    def __init__(self, pcm, sample_rate, channels):
+        self.pcm = pcm
+        self.sample_rate = sample_rate
+        self.channels = channels
+
+    @classmethod
+    def decode(cls, audio_file):
+        """Decodes audio_file with ffmpeg at its own sample rate and channel count."""
+        cmd = ["ffmpeg", "-nostdin", "-i", audio_file, "-f", "s16le", "-acodec", "pcm_s16le", "pipe:1"]
+        result = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, check=True)
+        match = OUTPUT_STREAM.search(result.stderr.decode(errors="replace"))
+        if not match:
+            raise ValueError(f"Could not read the decoded stream format of {audio_file}")
+        sample_rate = int(match.group(1))
+        channels = {"mono": 1, "stereo": 2}.get(match.group(2)) or int(match.group(3))
+        pcm = np.frombuffer(result.stdout, dtype=np.int16)
+        return cls(pcm[:len(pcm) - len(pcm) % channels].reshape(-1, channels), sample_rate, channels)
+
+    def __len__(self):
+        """Length in milliseconds, like pydub's AudioSegment."""
+        return len(self.pcm) * 1000 // self.sample_rate
+
+    @property
+    def sample_count(self):
+        return len(self.pcm)
+
+    def slice(self, start_ms, end_ms):
+        """The samples between two times in milliseconds, as a view into the decoded buffer (no copy)."""
+        start = max(0, start_ms * self.sample_rate // 1000)
+        end = min(len(self.pcm), end_ms * self.sample_rate // 1000)
+        return self.pcm[start:max(start, end)]
+
+    def release_before(self, ms):
+        """Nothing to release, the whole episode stays in memory."""
+
+
+class StreamingEpisodeAudio:
+    """
+    An episode decoded on demand through an ffmpeg pipe, keeping only a sliding window of PCM.
+
+    Clips must be requested in order of their start time: slice() reads ahead until the end of the
+    clip is decoded and release_before() drops the samples no later clip needs, so memory stays at
+    about the longest clip plus one read, whatever the length of the episode. The length, sample
+    rate and channel count come from ffprobe, as the window never holds the whole episode.
+    """
+
+    def __init__(self, audio_file, read_seconds=10):
+        info = mediainfo(audio_file)
+        self.sample_rate = int(info["sample_rate"])
+        self.channels = int(info["channels"])
+        self.length_ms = int(float(info["duration"]) * 1000)
+        self.read_bytes = read_seconds * self.sample_rate * self.channels * 2
+        cmd = ["ffmpeg", "-nostdin", "-v", "error", "-i", audio_file, "-f", "s16le", "-acodec", "pcm_s16le",
+               "-ar", str(self.sample_rate), "-ac", str(self.channels), "pipe:1"]
+        self.decoder = subprocess.Popen(cmd, stdout=subprocess.PIPE)
+        self.window = np.zeros((0, self.channels), dtype=np.int16)
+        self.window_start = 0
+        self.pending = b""
+        self.finished = False
+
+    def __len__(self):
+        return self.length_ms
+
+    @property
+    def sample_count(self):
+        return self.length_ms * self.sample_rate // 1000
+
+    def _read_until(self, sample):
+        while not self.finished and self.window_start + len(self.window) < sample:
+            data = self.decoder.stdout.read(self.read_bytes)
+            if not data:
+                self.finished = True
+                break
+            data = self.pending + data
+            frame_bytes = 2 * self.channels
+            usable = len(data) - len(data) % frame_bytes
+            self.pending = data[usable:]
+            block = np.frombuffer(data[:usable], dtype=np.int16).reshape(-1, self.channels)
+            # A new array, so views handed out earlier stay valid.
+            self.window = np.concatenate((self.window, block))
+
+    def slice(self, start_ms, end_ms):
+        """The samples between two times in milliseconds, or fewer when the stream ends first."""
+        start = max(0, start_ms * self.sample_rate // 1000)
+        end = end_ms * self.sample_rate // 1000
+        if start < self.window_start:
+            raise ValueError(f"Samples before {self.window_start} were already released")
+        self._read_until(end)
+        return self.window[start - self.window_start:max(start, end) - self.window_start]
+
+    def _skip_to(self, sample):
+        """Reads and discards the stream up to sample, so that nothing before it is ever decoded into the window."""
+        frame_bytes = 2 * self.channels
+        skip = (sample - self.window_start - len(self.window)) * frame_bytes
+        self.window = self.window[:0]
+        self.window_start = sample
+        if len(self.pending) >= skip:
+            self.pending = self.pending[skip:]
+            return
+        skip -= len(self.pending)
+        self.pending = b""
+        while skip > 0 and not self.finished:
+            data = self.decoder.stdout.read(min(self.read_bytes, skip))
+            if not data:
+                self.finished = True
+            skip -= len(data)
+
+    def release_before(self, ms):
+        """Drops the decoded samples before ms, and skips them in the stream if they were not decoded yet."""
+        sample = ms * self.sample_rate // 1000
+        if sample > self.window_start + len(self.window):
+            self._skip_to(sample)
+        elif sample > self.window_start:
+            self.window = self.window[min(len(self.window), sample - self.window_start):]
+            self.window_start = sample
+
+    def close(self):
+        # Killed before its pipe is closed, so an unfinished decoder exits without a broken pipe error
+        self.decoder.kill()
+        self.decoder.stdout.close()
+        self.decoder.wait()
+
+
+def samples_between(audio, start_ms, end_ms):
+    """Number of samples slice(start_ms, end_ms) returns, worked out without decoding anything."""
+    start = max(0, start_ms * audio.sample_rate // 1000)
+    end = min(audio.sample_count, end_ms * audio.sample_rate // 1000)
+    return max(0, end - start)
+
+
+def chunks(audio, start_ms, end_ms, chunk_ms=10000):
+    """The samples between two times in consecutive views of at most chunk_ms, releasing them as it goes."""
+    for chunk_start in range(start_ms, end_ms, chunk_ms):
+        chunk_end = min(end_ms, chunk_start + chunk_ms)
+        yield audio.slice(chunk_start, chunk_end)
+        audio.release_before(chunk_end)
+
+
+def write_pcm(stream, samples):
+    """Writes samples to stream without copying a contiguous view. memoryview cannot cast an empty one."""
+    if len(samples):
+        stream.write(memoryview(np.ascontiguousarray(samples)).cast("B"))
+
+
+def write_samples(stream, samples, length, channels):
+    """Writes exactly length samples to stream, padding with silence if samples falls short."""
+    samples = samples[:length]
+    write_pcm(stream, samples)
+    if len(samples) < length:
+        stream.write(np.zeros((length - len(samples), channels), dtype=np.int16).tobytes())
+
+
+def encode_clips(audio, clips, bitrate="128k"):
+    """
+    Encodes many clips of one episode to MP3 with a single ffmpeg process.
+
+    clips is a list of (start_ms, end_ms, filepath). The clips are written back to back, in order
+    of their start, into the encoder's stdin straight from views of the decoded audio (an
+    EpisodeAudio or a StreamingEpisodeAudio), each padded to whole MP3 frames and followed by
+    GUARD_FRAMES of silence, and the segment muxer cuts the output at the clip boundaries. The bit
+    reservoir is disabled so every segment decodes on its own. Segments are written to a temporary
+    directory next to the first clip and moved to their file names at the end.
+    """
+    if not clips:
+        return
+    clips = sorted(clips, key=lambda clip: clip[0])
+    guard = np.zeros((GUARD_FRAMES * FRAME_SAMPLES, audio.channels), dtype=np.int16)
+    lengths = [samples_between(audio, start_ms, end_ms) for start_ms, end_ms, _ in clips]
+    boundaries = []
+    position = 0
+    for length in lengths:
+        position += length + (-length % FRAME_SAMPLES) + len(guard)
+        boundaries.append(position / audio.sample_rate)
+
+    work_dir = tempfile.mkdtemp(prefix=".clips_", dir=os.path.dirname(os.path.abspath(clips[0][2])))
+    try:
+        cmd = [
+            "ffmpeg", "-v", "error",
+            "-f", "s16le", "-ar", str(audio.sample_rate), "-ac", str(audio.channels), "-i", "pipe:0",
+            "-c:a", "libmp3lame", "-b:a", bitrate, "-reservoir", "0",
+            "-f", "segment", "-segment_format", "mp3",
+            # Without a LAME tag the player does not trim the priming samples of the first segment
+            # from every later one.
+            "-segment_format_options", "write_xing=0",
+            "-segment_times", ",".join(f"{t:.6f}" for t in boundaries[:-1]),
+            os.path.join(work_dir, "%06d.mp3"),
+        ]
+        with subprocess.Popen(cmd, stdin=subprocess.PIPE) as encoder:
+            for (start_ms, end_ms, _), length in zip(clips, lengths):
+                # No later clip starts before this one, so nothing before it is needed any more.
+                audio.release_before(start_ms)
+                write_samples(encoder.stdin, audio.slice(start_ms, end_ms), length + (-length % FRAME_SAMPLES),
+                              audio.channels)
+                encoder.stdin.write(guard.tobytes())
+            encoder.stdin.close()
+        if encoder.returncode != 0:
+            raise subprocess.CalledProcessError(encoder.returncode, cmd)
+
+        for index, (_, _, filepath) in enumerate(clips):
+            os.replace(os.path.join(work_dir, f"{index:06d}.mp3"), filepath)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+def clip_boundaries(clips):
+    """Every distinct clip start and end after 0, in milliseconds."""
+    return sorted({ms for start_ms, end_ms, _ in clips for ms in (start_ms, end_ms)} - {0})
+
+
+def piece_cmd(boundaries, work_dir):
+    """
+    ffmpeg output options splitting an MP3 stream into pieces at the boundaries. The pieces hold
+    nothing but MP3 frames (no ID3 or Xing header), so any run of consecutive pieces concatenated
+    byte by byte is a valid MP3 stream again. The segment list records where each piece starts.
+    """
+    return [
+        "-f", "segment", "-segment_format", "mp3",
+        "-segment_format_options", "write_xing=0:id3v2_version=0",
+        "-segment_times", ",".join(f"{ms / 1000:.3f}" for ms in boundaries),
+        "-segment_list", os.path.join(work_dir, "pieces.csv"), "-segment_list_type", "csv",
+        os.path.join(work_dir, "%06d.mp3"),
+    ]
+
+
+def assemble_clips(work_dir, clips):
+    """Writes every clip as the concatenation of the pieces in work_dir that it covers."""
+    # Boundaries closer together than a frame share a cut, so map clips onto the pieces by the
+    # times the muxer actually cut at rather than by counting boundaries.
+    with open(os.path.join(work_dir, "pieces.csv")) as f:
+        pieces = [(float(start), os.path.join(work_dir, name))
+                  for name, start, _ in (line.strip().split(",") for line in f if line.strip())]
+    piece_starts = [start for start, _ in pieces]
+    contents = {}
+
+    def piece(index):
+        if index not in contents:
+            with open(pieces[index][1], 'rb') as f:
+                contents[index] = f.read()
+        return contents[index]
+
+    for start_ms, end_ms, filepath in clips:
+        first = bisect.bisect_left(piece_starts, start_ms / 1000 - 0.0005)
+        last = bisect.bisect_left(piece_starts, end_ms / 1000 - 0.0005)
+        with open(filepath, 'wb') as f:
+            for index in range(first, last):
+                f.write(piece(index))
+
+
+def copy_clips(audio_file, clips):
+    """
+    Cuts clips out of an MP3 without decoding or re-encoding anything, with one ffmpeg run per episode.
+
+    The episode is split with stream copy at every clip start and end (see piece_cmd) and each
+    clip is assembled from the pieces it covers. Cuts land on MP3 frame boundaries (26 ms at
+    44.1 kHz) instead of the exact millisecond, and the first frame of a clip may decode with a
+    short glitch when it borrowed bits from the frame before it.
+    """
+    if not clips:
+        return
+    work_dir = tempfile.mkdtemp(prefix=".clips_", dir=os.path.dirname(os.path.abspath(clips[0][2])))
+    try:
+        cmd = ["ffmpeg", "-v", "error", "-i", audio_file, "-map", "0:a:0", "-map_metadata", "-1", "-c", "copy"]
+        subprocess.run(cmd + piece_cmd(clip_boundaries(clips), work_dir), check=True)
+        assemble_clips(work_dir, clips)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+def encode_clips_once(audio, clips, bitrate="128k"):
+    """
+    Encodes every second of the episode once, however many clips overlap it.
+
+    The decoded episode is streamed through one encoder that is cut into pieces at every clip
+    start and end (see piece_cmd), and each clip is assembled from the pieces it covers. Where
+    encode_clips encodes a context clip and both its neighbours' context clips separately, here
+    the shared audio is encoded a single time and only the MP3 frames are copied. Cuts land on
+    frame boundaries and, like the encoder delay, are within about 26 ms of the requested times.
+    The bit reservoir is disabled so a clip never depends on frames of the piece before it.
+    """
+    if not clips:
+        return
+    end_ms = max(end_ms for _, end_ms, _ in clips)
+    work_dir = tempfile.mkdtemp(prefix=".clips_", dir=os.path.dirname(os.path.abspath(clips[0][2])))
+    try:
+        cmd = [
+            "ffmpeg", "-v", "error",
+            "-f", "s16le", "-ar", str(audio.sample_rate), "-ac", str(audio.channels), "-i", "pipe:0",
+            "-c:a", "libmp3lame", "-b:a", bitrate, "-reservoir", "0",
+        ] + piece_cmd(clip_boundaries(clips), work_dir)
+        with subprocess.Popen(cmd, stdin=subprocess.PIPE) as encoder:
+            for samples in chunks(audio, 0, end_ms):
+                write_pcm(encoder.stdin, samples)
+            encoder.stdin.close()
+        if encoder.returncode != 0:
+            raise subprocess.CalledProcessError(encoder.returncode, cmd)
+        assemble_clips(work_dir, clips)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
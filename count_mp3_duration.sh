@@ -1,21 +1,10 @@
 #!/bin/bash
 
 # Check if the directory is provided
-if [ "$#" -ne 1 ]; then
-    echo "Usage: $0 directory"
+if [ "$#" -lt 1 ]; then
+    echo "Usage: $0 directory [--jobs_db FILE] [--cache FILE]"
     exit 1
 fi
 
-DIRECTORY="$1"
-
-# Check if exiftool is installed
-if ! command -v exiftool &> /dev/null; then
-    echo "exiftool could not be found"
-    exit 1
-fi
-
-# Calculate total duration
-total_duration=$(exiftool -q -p '$Duration#' -r -ext mp3 "$DIRECTORY" | awk '{s+=$1} END {print s}')
-
-total_hours=$(echo "scale=2; $total_duration / 3600" | bc)
-echo "Total duration: $total_duration seconds ($total_hours hours)"
+# Durations come from the MP3/WAV headers and are cached, see transcription/audio_duration.py
+exec python3 "$(dirname "$0")/transcription/audio_duration.py" "$@"
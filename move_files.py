@@ -19,17 +19,16 @@ def move_correct_files(src_directory, dest_directory, silent_mode):
             srt_path = os.path.join(src_directory, base + '.srt')
             buggy_srt_path = os.path.join(src_directory, base + '_buggy.srt')
 
-            if os.path.isfile(wav_path) and os.path.isfile(srt_path): #and not os.path.isfile(buggy_srt_path):
+            # The .wav is optional, not every transcription run keeps one next to the .mp3.
+            if os.path.isfile(srt_path): #and not os.path.isfile(buggy_srt_path):
                 # Move files
-                shutil.move(mp3_path, dest_directory)
-                shutil.move(wav_path, dest_directory)
-                shutil.move(srt_path, dest_directory)
+                group = [mp3_path, srt_path] + ([wav_path] if os.path.isfile(wav_path) else [])
+                for path in group:
+                    shutil.move(path, dest_directory)
                 moved_count += 1
-                logging.info(f'Moved group: {filename}, {base}.wav, {base}.srt')
+                logging.info(f'Moved group: {", ".join(os.path.basename(path) for path in group)}')
             else:
                 # Logging reasons why not moved
-                if not os.path.isfile(wav_path):
-                    logging.info(f'Left {filename} because corresponding .wav file is missing.')
                 if not os.path.isfile(srt_path):
                     logging.info(f'Left {filename} because corresponding .srt file is missing.')
                 # if os.path.isfile(buggy_srt_path):
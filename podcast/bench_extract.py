@@ -0,0 +1,95 @@
+import argparse
+import glob
+import os
+import time
+
+import requests
+from bs4 import BeautifulSoup
+
+from extract import EXTRACTORS, lxml, get_extractor
+from profiles import load_profile
+
+
+def save_fixtures(base_url, first_page, last_page, fixtures_dir):
+    """Saves archive pages as fixture files so benchmarks run offline and on identical input."""
+    os.makedirs(fixtures_dir, exist_ok=True)
+    for page_num in range(first_page, last_page + 1):
+        url = f"{base_url}/page/{page_num}/"
+        response = requests.get(url, headers={'User-Agent': 'Mozilla/5.0'})
+        response.raise_for_status()
+        with open(os.path.join(fixtures_dir, f"page_{page_num:04}.html"), 'wb') as f:
+            f.write(response.content)
+        print(f"Saved {url}")
+
+
+def legacy_extract(html, article_class, audio_class):
+    """The pre-extractor code path: full html.parser parse, with the audio lookup run twice per article."""
+    required = set(article_class.split())
+    soup = BeautifulSoup(html, 'html.parser')
+    articles = [a for a in soup.find_all("article") if required.issubset(a.get("class", []))]
+    len([a.find("audio", {"class": audio_class}) for a in articles if a.find("audio", {"class": audio_class})])
+    urls = []
+    for article in articles:
+        audio_tag = article.find("audio", {"class": audio_class})
+        if audio_tag:
+            source_tag = audio_tag.find("source")
+            if source_tag and 'src' in source_tag.attrs:
+                urls.append(source_tag['src'])
+    return urls
+
+
+def run_benchmark(pages, article_class, audio_class, repeat):
+    backends = {"legacy": lambda html: legacy_extract(html, article_class, audio_class)}
+    for name in EXTRACTORS:
+        if name == "lxml" and lxml is None:
+            print("lxml is not installed, skipping the lxml backend.")
+            continue
+        backends[name] = get_extractor(name, article_class, audio_class)
+
+    reference = [[episode.url for episode in backends["soup"](html)] for html in pages]
+    timings = {}
+    for name, extractor in backends.items():
+        for html, expected in zip(pages, reference):
+            result = extractor(html)
+            urls = result if name == "legacy" else [episode.url for episode in result]
+            if urls != expected:
+                raise AssertionError(f"Backend {name} disagrees with the reference extraction")
+
+        started = time.perf_counter()
+        for _ in range(repeat):
+            for html in pages:
+                extractor(html)
+        timings[name] = (time.perf_counter() - started) / repeat
+
+    episodes = sum(len(urls) for urls in reference)
+    print(f"{len(pages)} pages, {episodes} episodes, mean of {repeat} timed passes:")
+    for name, seconds in sorted(timings.items(), key=lambda item: item[1]):
+        print(f"  {name:<10} {seconds * 1000:9.1f} ms  ({timings['legacy'] / seconds:5.1f}x vs legacy)")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Benchmark the HTML extractor backends over saved archive pages")
+    parser.add_argument("--fixtures", type=str, required=True, help="Directory with saved *.html archive pages")
+    parser.add_argument("--profile", type=str, default="original",
+                        help="Site profile (see profiles.py) supplying the article and audio selectors")
+    parser.add_argument("--repeat", type=int, default=5, help="Number of timed passes over the fixtures")
+    parser.add_argument("--saveFrom", type=str, default=None,
+                        help="Base URL to download fixtures from before benchmarking")
+    parser.add_argument("--firstPage", type=int, default=1, help="First page to save with --saveFrom")
+    parser.add_argument("--lastPage", type=int, default=10, help="Last page to save with --saveFrom")
+
+    args = parser.parse_args()
+
+    if args.saveFrom:
+        save_fixtures(args.saveFrom, args.firstPage, args.lastPage, args.fixtures)
+
+    page_files = sorted(glob.glob(os.path.join(args.fixtures, "*.html")))
+    if not page_files:
+        raise SystemExit(f"No *.html fixtures found in {args.fixtures}")
+    pages = []
+    for page_file in page_files:
+        with open(page_file, 'rb') as f:
+            pages.append(f.read())
+
+    profile = load_profile(args.profile)
+    run_benchmark(pages, profile["article_class"], profile["audio_class"], args.repeat)
@@ -0,0 +1,250 @@
+import argparse
+import os
+import time
+import xml.etree.ElementTree as ET
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import requests
+from fake_useragent import UserAgent
+
+from episode_state import EpisodeState, all_known, page_numbers
+from extract import DEFAULT_EXTRACTOR, EXTRACTORS, get_extractor
+from feed import fetch_feed_episodes
+from http_session import PageCache, create_session, fetch_page
+from profiles import NAMING_RULES, PROFILES, load_profile
+from throttle import HostLimiter, TokenBucket
+from transfer import download_file
+
+
+def episode_link(profile, episode):
+    """Returns the (file_name, audio_url) pair of an episode named by the profile's rule, or None."""
+    file_name = NAMING_RULES[profile["naming"]](episode.url, episode.title)
+    if not file_name:
+        return None
+    return file_name, episode.url
+
+
+def discover_page_links(profile, base_url, first_page, last_page, headers, session, cache=None, state=None,
+                        extractor=None):
+    """
+    Walks the archive pages from last_page down to first_page and yields (file_name, audio_url) pairs.
+
+    With an EpisodeState the walk goes newest-first instead and stops at the first page whose
+    episodes are all already known.
+    """
+    extractor = extractor or get_extractor(DEFAULT_EXTRACTOR, profile["article_class"], profile["audio_class"])
+    for page_num in page_numbers(first_page, last_page, incremental=state is not None):
+        url = profile["page_url"].format(base_url=base_url, page=page_num)
+        print(f"Fetching content from {url}...")
+
+        try:
+            content = fetch_page(session, url, headers, cache)
+            print(f"Successfully fetched content from page {page_num}.")
+        except requests.RequestException as e:
+            print(f"Error fetching page {page_num}: {e}")
+            continue
+
+        links = [link for link in (episode_link(profile, e) for e in extractor(content)) if link]
+        print(f"Found {len(links)} .mp3 links on page {page_num}.")
+
+        if state and all_known(state, [audio_url for _, audio_url in links]):
+            print(f"All episodes on page {page_num} are already known. Stopping incremental crawl.")
+            return
+
+        yield from links
+
+
+def discover_feed_links(profile, feed_url, headers, session):
+    """Yields (file_name, audio_url) pairs for every audio enclosure of an RSS/Atom feed."""
+    try:
+        for episode in fetch_feed_episodes(session, feed_url, headers):
+            link = episode_link(profile, episode)
+            if link:
+                yield link
+    except (requests.RequestException, ET.ParseError) as e:
+        print(f"Error reading feed {feed_url}: {e}")
+
+
+def file_already_exists(file_path):
+    """Checks if the file already exists and is not empty. Unfinished downloads only ever live in a .part file."""
+    return os.path.exists(file_path) and os.path.getsize(file_path) > 0
+
+
+def download_audio(file_name, file_path, audio_url, headers, session):
+    """
+    Downloads a single audio file via a resumable .part file, reporting errors instead of raising them.
+    Returns True on success.
+    """
+    print(f"Preparing to download {file_name}...")
+    try:
+        download_file(audio_url, file_path, headers, session=session)
+        print(f"{file_name} downloaded successfully!")
+        return True
+    except requests.RequestException as e:
+        print(f"Error downloading {file_name}: {e}")
+        return False
+
+
+def prepare_save_path(save_path):
+    if not os.path.exists(save_path):
+        os.makedirs(save_path)
+        print(f"Directory {save_path} created.")
+    else:
+        print(f"Directory {save_path} already exists.")
+
+
+def open_state(save_path, incremental, state_file):
+    """Opens the seen-episodes store for an incremental crawl, or returns None for a full crawl."""
+    if not incremental:
+        return None
+    return EpisodeState(state_file or os.path.join(save_path, ".episodes.sqlite"))
+
+
+def download_sequentially(links, save_path, headers, session, state, delay):
+    """Downloads one file at a time, sleeping `delay` seconds after each download."""
+    for file_name, audio_url in links:
+        file_path = os.path.join(save_path, file_name)
+        if file_already_exists(file_path):
+            print(f"{file_name} already exists and is not empty. Skipping download.")
+            if state:
+                state.mark(audio_url, file_name)
+            continue
+
+        if download_audio(file_name, file_path, audio_url, headers, session) and state:
+            state.mark(audio_url, file_name)
+
+        print(f"Waiting for {delay} seconds before next download...")
+        time.sleep(delay)
+
+
+def download_concurrently(links, save_path, headers, session, state, workers, per_host, rate):
+    """
+    Downloads with a pool of worker threads.
+
+    `links` is consumed in the calling thread and every new file is queued as soon as it is
+    discovered, so page discovery runs ahead of the transfers. At most `per_host` transfers hit the
+    same host at once and new transfers are started at no more than `rate` per second (token
+    bucket, 0 disables it).
+    """
+    bucket = TokenBucket(rate, capacity=per_host)
+    limiter = HostLimiter(per_host)
+
+    def transfer(file_name, file_path, audio_url):
+        with limiter.slot(audio_url):
+            bucket.acquire()
+            if download_audio(file_name, file_path, audio_url, headers, session) and state:
+                state.mark(audio_url, file_name)
+
+    queued = set()
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = []
+        for file_name, audio_url in links:
+            file_path = os.path.join(save_path, file_name)
+            if file_path in queued:
+                continue
+            if file_already_exists(file_path):
+                print(f"{file_name} already exists and is not empty. Skipping download.")
+                if state:
+                    state.mark(audio_url, file_name)
+                continue
+            queued.add(file_path)
+            futures.append(executor.submit(transfer, file_name, file_path, audio_url))
+
+        for future in as_completed(futures):
+            future.result()
+
+
+def download_audios(profile, base_url, save_path, first_page=None, last_page=None, delay=0, workers=0, per_host=2,
+                    rate=None, cache_dir=None, incremental=False, state_file=None, extractor_name=DEFAULT_EXTRACTOR,
+                    feed_url=None):
+    """
+    Downloads every episode of a show described by `profile` (see profiles.py).
+
+    Episodes come from the archive pages first_page..last_page, or from feed_url when given.
+    With workers > 0 files are downloaded concurrently, otherwise one at a time with `delay`
+    seconds between downloads. `rate` defaults to one download per `delay` seconds.
+    """
+    print("Initializing audio download...")
+
+    ua = UserAgent()
+    prepare_save_path(save_path)
+
+    headers = {
+        'User-Agent': ua.random
+    }
+    session = create_session(pool_size=max(workers, per_host))
+    cache = PageCache(cache_dir) if cache_dir else None
+    state = open_state(save_path, incremental, state_file)
+    extractor = get_extractor(extractor_name, profile["article_class"], profile["audio_class"])
+
+    if feed_url:
+        links = discover_feed_links(profile, feed_url, headers, session)
+    else:
+        links = discover_page_links(profile, base_url, first_page, last_page, headers, session, cache, state,
+                                    extractor)
+
+    if workers > 0:
+        if rate is None:
+            rate = 1 / delay if delay > 0 else 0
+        print(f"Downloading with {workers} workers, {per_host} per host...")
+        download_concurrently(links, save_path, headers, session, state, workers, per_host, rate)
+    else:
+        download_sequentially(links, save_path, headers, session, state, delay)
+
+    print("Finished downloading audios.")
+
+
+def build_arg_parser(default_profile=None):
+    parser = argparse.ArgumentParser(description="Download audios from WordPress website")
+    parser.add_argument("--profile", type=str, default=default_profile, required=default_profile is None,
+                        help=f"Site profile: one of {', '.join(PROFILES)} or a JSON profile file")
+    parser.add_argument("--baseUrl", type=str, required=True,
+                        help="Base URL of the website (e.g. https://original.nihongoconteppei.com)")
+    parser.add_argument("--savePath", type=str, required=True, help="Path to save the downloaded audio files")
+    parser.add_argument("--firstPage", type=int, help="Starting page number (required unless a feed is used)")
+    parser.add_argument("--lastPage", type=int, help="Last page number (required unless a feed is used)")
+    parser.add_argument("--delay", type=int, required=True, help="Delay in seconds after each file download")
+    parser.add_argument("--workers", type=int, default=0,
+                        help="Number of parallel downloads. 0 keeps the sequential downloader")
+    parser.add_argument("--perHost", type=int, default=2, help="Maximum simultaneous downloads from one host")
+    parser.add_argument("--rate", type=float, default=None,
+                        help="Maximum downloads started per second. Defaults to 1/delay, 0 disables the limit")
+    parser.add_argument("--cacheDir", type=str, default=None,
+                        help="Directory for cached archive pages, revalidated with ETag/Last-Modified on later runs")
+    parser.add_argument("--incremental", action="store_true",
+                        help="Crawl newest-first and stop at the first page that holds only known episodes")
+    parser.add_argument("--stateFile", type=str, default=None,
+                        help="SQLite file of known episodes for --incremental (default: <savePath>/.episodes.sqlite)")
+    parser.add_argument("--parser", type=str, default=DEFAULT_EXTRACTOR, choices=sorted(EXTRACTORS),
+                        help="HTML extraction backend (lxml is fastest when installed)")
+    parser.add_argument("--feed", action="store_true", help="Read episodes from the profile's RSS feed URL")
+    parser.add_argument("--feedUrl", type=str, default=None,
+                        help="Read episodes from this RSS/Atom feed (e.g. <baseUrl>/feed/) instead of scraping pages")
+    return parser
+
+
+def main(default_profile=None):
+    print("Starting script...")
+
+    parser = build_arg_parser(default_profile)
+    args = parser.parse_args()
+    try:
+        profile = load_profile(args.profile)
+    except ValueError as e:
+        parser.error(str(e))
+
+    feed_url = args.feedUrl or (profile["feed_url"].format(base_url=args.baseUrl) if args.feed else None)
+    if not feed_url and (args.firstPage is None or args.lastPage is None):
+        parser.error("--firstPage and --lastPage are required unless --feed or --feedUrl is given")
+
+    print(
+        f"Arguments received: profile={args.profile}, baseUrl={args.baseUrl}, savePath={args.savePath}, firstPage={args.firstPage}, lastPage={args.lastPage}, delay={args.delay}")
+
+    download_audios(profile, args.baseUrl, args.savePath, args.firstPage, args.lastPage, args.delay,
+                    workers=args.workers, per_host=args.perHost, rate=args.rate, cache_dir=args.cacheDir,
+                    incremental=args.incremental, state_file=args.stateFile, extractor_name=args.parser,
+                    feed_url=feed_url)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,50 @@
+import sqlite3
+import threading
+import time
+
+
+class EpisodeState:
+    """
+    Small SQLite store of the episode URLs the downloader has already handled.
+
+    An episode is recorded once its file is on disk (downloaded or found), which lets an incremental
+    crawl stop at the first archive page made up only of known episodes. Safe to share between threads.
+    """
+
+    def __init__(self, db_path):
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        self.lock = threading.Lock()
+        with self.lock, self.conn:
+            self.conn.execute(
+                "CREATE TABLE IF NOT EXISTS episodes (url TEXT PRIMARY KEY, file_name TEXT, seen_at REAL)")
+
+    def known(self, urls):
+        """Returns the subset of urls that are already recorded."""
+        urls = list(urls)
+        if not urls:
+            return set()
+        placeholders = ",".join("?" * len(urls))
+        with self.lock:
+            rows = self.conn.execute(f"SELECT url FROM episodes WHERE url IN ({placeholders})", urls).fetchall()
+        return {row[0] for row in rows}
+
+    def mark(self, url, file_name):
+        with self.lock, self.conn:
+            self.conn.execute("INSERT OR REPLACE INTO episodes (url, file_name, seen_at) VALUES (?, ?, ?)",
+                              (url, file_name, time.time()))
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+
+def page_numbers(first_page, last_page, incremental):
+    """Archive pages in crawl order: oldest first for a full crawl, newest first for an incremental one."""
+    if incremental:
+        return range(first_page, last_page + 1)
+    return range(last_page, first_page - 1, -1)
+
+
+def all_known(state, urls):
+    """True when a page has episodes and every one of them is already recorded in state."""
+    return bool(urls) and len(state.known(urls)) == len(set(urls))
@@ -0,0 +1,100 @@
+from collections import namedtuple
+
+from bs4 import BeautifulSoup, SoupStrainer
+
+try:
+    import lxml.html
+except ImportError:  # lxml is optional, the BeautifulSoup backends work without it
+    lxml = None
+
+# Compact record of one episode found on an archive page.
+Episode = namedtuple("Episode", ["title", "url", "date"])
+
+
+def _has_classes(class_value, required):
+    if isinstance(class_value, str):
+        class_value = class_value.split()
+    return required.issubset(class_value or ())
+
+
+def _episode_from_soup_article(article, audio_class):
+    """Builds an Episode from one bs4 <article>, or returns None when it has no playable audio."""
+    audio_tag = article.find("audio", {"class": audio_class})
+    if not audio_tag:
+        return None
+    source_tag = audio_tag.find("source")
+    if not source_tag or 'src' not in source_tag.attrs:
+        return None
+    title_tag = article.find("h2")
+    time_tag = article.find("time")
+    return Episode(
+        title=title_tag.text.strip() if title_tag else None,
+        url=source_tag['src'],
+        date=time_tag.get("datetime") if time_tag else None,
+    )
+
+
+def extract_with_soup(html, article_class, audio_class):
+    """Reference backend: full html.parser parse of the page."""
+    required = set(article_class.split())
+    soup = BeautifulSoup(html, 'html.parser')
+    articles = soup.find_all("article")
+    episodes = (_episode_from_soup_article(a, audio_class) for a in articles if _has_classes(a.get("class"), required))
+    return [episode for episode in episodes if episode]
+
+
+def extract_with_strainer(html, article_class, audio_class):
+    """html.parser backend that only builds the <article> subtrees, skipping navigation, sidebars and footers."""
+    required = set(article_class.split())
+    soup = BeautifulSoup(html, 'html.parser', parse_only=SoupStrainer("article"))
+    articles = soup.find_all("article")
+    episodes = (_episode_from_soup_article(a, audio_class) for a in articles if _has_classes(a.get("class"), required))
+    return [episode for episode in episodes if episode]
+
+
+def extract_with_lxml(html, article_class, audio_class):
+    """libxml2 backend, the fastest when lxml is installed."""
+    required = set(article_class.split())
+    root = lxml.html.fromstring(html)
+    episodes = []
+    for article in root.iter("article"):
+        if not _has_classes(article.get("class", ""), required):
+            continue
+        audio_tag = next((a for a in article.iter("audio") if audio_class in a.get("class", "").split()), None)
+        if audio_tag is None:
+            continue
+        source_tag = next(audio_tag.iter("source"), None)
+        if source_tag is None or source_tag.get("src") is None:
+            continue
+        title_tag = next(article.iter("h2"), None)
+        time_tag = next(article.iter("time"), None)
+        episodes.append(Episode(
+            title=title_tag.text_content().strip() if title_tag is not None else None,
+            url=source_tag.get("src"),
+            date=time_tag.get("datetime") if time_tag is not None else None,
+        ))
+    return episodes
+
+
+EXTRACTORS = {
+    "soup": extract_with_soup,
+    "strainer": extract_with_strainer,
+    "lxml": extract_with_lxml,
+}
+
+DEFAULT_EXTRACTOR = "lxml" if lxml else "strainer"
+
+
+def get_extractor(name, article_class, audio_class):
+    """
+    Returns a function html -> [Episode] for the named backend.
+
+    `article_class` lists the classes (space separated) an <article> must carry and `audio_class`
+    the class of the <audio> tag holding the episode, so each site keeps its own selectors.
+    """
+    if name not in EXTRACTORS:
+        raise ValueError(f"Unknown extractor {name}, expected one of {', '.join(EXTRACTORS)}")
+    if name == "lxml" and lxml is None:
+        raise ValueError("The lxml extractor needs the lxml package (pip install lxml)")
+    backend = EXTRACTORS[name]
+    return lambda html: backend(html, article_class, audio_class)
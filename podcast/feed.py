@@ -0,0 +1,61 @@
+import xml.etree.ElementTree as ET
+
+from extract import Episode
+
+ATOM = "{http://www.w3.org/2005/Atom}"
+
+
+def _rss_item_to_episode(item):
+    enclosure = item.find("enclosure")
+    if enclosure is None or not enclosure.get("url"):
+        return None
+    return Episode(title=(item.findtext("title") or "").strip() or None,
+                   url=enclosure.get("url"),
+                   date=item.findtext("pubDate"))
+
+
+def _atom_entry_to_episode(entry):
+    enclosure = next((link for link in entry.iter(ATOM + "link") if link.get("rel") == "enclosure"), None)
+    if enclosure is None or not enclosure.get("href"):
+        return None
+    return Episode(title=(entry.findtext(ATOM + "title") or "").strip() or None,
+                   url=enclosure.get("href"),
+                   date=entry.findtext(ATOM + "published") or entry.findtext(ATOM + "updated"))
+
+
+def iter_feed_episodes(stream):
+    """
+    Yields an Episode for every RSS <item> or Atom <entry> with an audio enclosure.
+
+    The feed is read incrementally with iterparse and every item is cleared from the tree once it
+    has been turned into an Episode, so memory stays flat however many items the feed lists.
+    """
+    open_elements = []
+    for event, element in ET.iterparse(stream, events=("start", "end")):
+        if event == "start":
+            open_elements.append(element)
+            continue
+        open_elements.pop()
+
+        if element.tag == "item":
+            episode = _rss_item_to_episode(element)
+        elif element.tag == ATOM + "entry":
+            episode = _atom_entry_to_episode(element)
+        else:
+            continue
+
+        if episode:
+            yield episode
+        # Detach the finished item from its parent, otherwise the parsed items pile up in the tree.
+        if open_elements:
+            open_elements[-1].remove(element)
+        element.clear()
+
+
+def fetch_feed_episodes(session, feed_url, headers, timeout=30):
+    """Streams the feed at feed_url and yields its episodes as they are parsed."""
+    print(f"Fetching feed {feed_url}...")
+    with session.get(feed_url, headers=headers, stream=True, timeout=timeout) as response:
+        response.raise_for_status()
+        response.raw.decode_content = True
+        yield from iter_feed_episodes(response.raw)
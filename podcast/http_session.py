@@ -0,0 +1,99 @@
+import hashlib
+import json
+import os
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+
+def create_session(pool_size=10, retries=3, backoff=1.0):
+    """
+    Creates a requests session shared by every page and audio fetch of a run.
+
+    Connections are kept alive and pooled (up to `pool_size` per host), so each host costs one
+    TCP+TLS handshake per pooled connection instead of one per request. Connection errors and
+    429/5xx responses are retried with exponential backoff, honouring Retry-After.
+    """
+    retry = Retry(
+        total=retries,
+        backoff_factor=backoff,
+        status_forcelist=(429, 500, 502, 503, 504),
+        allowed_methods=frozenset({"GET", "HEAD"}),
+        respect_retry_after_header=True,
+    )
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+    session = requests.Session()
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+class PageCache:
+    """
+    On-disk cache of fetched pages keyed by URL.
+
+    Each entry stores the body and the ETag/Last-Modified validators of the response. Later fetches
+    of the same URL send If-None-Match/If-Modified-Since, and a 304 answer is served from disk.
+    """
+
+    def __init__(self, cache_dir):
+        self.cache_dir = cache_dir
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def _paths(self, url):
+        key = hashlib.sha1(url.encode('utf-8')).hexdigest()
+        return os.path.join(self.cache_dir, key + ".body"), os.path.join(self.cache_dir, key + ".json")
+
+    def _load(self, url):
+        body_path, meta_path = self._paths(url)
+        if not (os.path.exists(body_path) and os.path.exists(meta_path)):
+            return None, None
+        with open(meta_path, 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+        return body_path, meta
+
+    def _store(self, url, response):
+        body_path, meta_path = self._paths(url)
+        meta = {
+            'url': url,
+            'etag': response.headers.get('ETag'),
+            'last_modified': response.headers.get('Last-Modified'),
+        }
+        if not meta['etag'] and not meta['last_modified']:
+            return
+        with open(body_path + ".tmp", 'wb') as f:
+            f.write(response.content)
+        os.replace(body_path + ".tmp", body_path)
+        with open(meta_path + ".tmp", 'w', encoding='utf-8') as f:
+            json.dump(meta, f)
+        os.replace(meta_path + ".tmp", meta_path)
+
+    def fetch(self, session, url, headers, timeout=30):
+        """Returns the body of url, revalidating a cached copy with a conditional request."""
+        body_path, meta = self._load(url)
+        request_headers = dict(headers)
+        if meta:
+            if meta.get('etag'):
+                request_headers['If-None-Match'] = meta['etag']
+            if meta.get('last_modified'):
+                request_headers['If-Modified-Since'] = meta['last_modified']
+
+        response = session.get(url, headers=request_headers, timeout=timeout)
+        if response.status_code == 304 and body_path:
+            print(f"{url} not modified, using cached copy.")
+            with open(body_path, 'rb') as f:
+                return f.read()
+
+        response.raise_for_status()
+        self._store(url, response)
+        return response.content
+
+
+def fetch_page(session, url, headers, cache=None, timeout=30):
+    """Fetches url through the page cache when one is configured, returning the raw body."""
+    if cache:
+        return cache.fetch(session, url, headers, timeout=timeout)
+    response = session.get(url, headers=headers, timeout=timeout)
+    response.raise_for_status()
+    return response.content
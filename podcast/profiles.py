@@ -0,0 +1,100 @@
+import json
+import os
+import re
+from urllib.parse import unquote  # Importing this to decode the URL
+
+
+def format_filename_from_url(audio_url, title=None):
+    """
+    Names the file after the last path segment of the audio URL and formats the number at its start
+    to have at least four digits.
+
+    Args:
+    - audio_url (str): URL of the audio file
+    - title (str): Unused, kept so every naming rule has the same signature
+
+    Returns:
+    - str: Reformatted filename
+    """
+    file_name = unquote(os.path.basename(audio_url))
+    match = re.match(r'^(\d+)', file_name)
+    if match:
+        number_part = match.group(1)
+        formatted_number = f"{int(number_part):04}"  # Format the number to have at least four digits
+        return file_name.replace(number_part, formatted_number, 1)
+    return file_name
+
+
+def format_filename_from_title(audio_url, title):
+    """
+    Extracts the episode number from the title, removes leading #, formats it to have at least four digits,
+    and adds an underscore between the episode number and the rest of the title.
+
+    Args:
+    - audio_url (str): Unused, kept so every naming rule has the same signature
+    - title (str): Original title from the h2 tag or the feed item
+
+    Returns:
+    - str: Reformatted filename, or None when the episode has no title
+    """
+    if not title:
+        return None
+
+    # Remove the leading '#'
+    title = title.replace("#", "", 1)
+
+    # Extract the episode number using regex
+    match = re.match(r'^(\d+)', title)
+    if match:
+        number_part = match.group(1)
+        formatted_number = f"{int(number_part):04}"  # Format the number to have at least four digits
+        title = title.replace(number_part, formatted_number + "_", 1)
+    return title + ".mp3"
+
+
+NAMING_RULES = {
+    "url": format_filename_from_url,
+    "title": format_filename_from_title,
+}
+
+# Every site profile is plain data: the selectors of an episode on an archive page, how its file
+# is named and where the archive pages and feed live. Profiles can also be loaded from a JSON file
+# with the same keys.
+DEFAULT_PROFILE = {
+    "article_class": "post",
+    "audio_class": "wp-audio-shortcode",
+    "naming": "url",
+    "page_url": "{base_url}/page/{page}/",
+    "feed_url": "{base_url}/feed/",
+}
+
+PROFILES = {
+    # https://original.nihongoconteppei.com
+    "original": {
+        "article_class": "post",
+        "audio_class": "clip",
+        "naming": "url",
+    },
+    # Beginner show: the audio URL is not descriptive, files are named after the post title.
+    "beginner": {
+        "article_class": "post type-post",
+        "audio_class": "wp-audio-shortcode",
+        "naming": "title",
+    },
+}
+
+
+def load_profile(name_or_path):
+    """Returns the complete profile for a built-in profile name or a JSON profile file."""
+    if name_or_path in PROFILES:
+        overrides = PROFILES[name_or_path]
+    elif os.path.isfile(name_or_path):
+        with open(name_or_path, 'r', encoding='utf-8') as f:
+            overrides = json.load(f)
+    else:
+        raise ValueError(f"Unknown profile {name_or_path}, expected one of {', '.join(PROFILES)} or a JSON file")
+
+    profile = dict(DEFAULT_PROFILE, **overrides)
+    if profile["naming"] not in NAMING_RULES:
+        raise ValueError(f"Unknown naming rule {profile['naming']}, expected one of {', '.join(NAMING_RULES)}")
+    return profile
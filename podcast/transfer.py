@@ -0,0 +1,87 @@
+import os
+import re
+
+import requests
+
+PART_SUFFIX = ".part"
+
+
+class IncompleteDownload(requests.RequestException):
+    """Raised when the server closed the transfer before Content-Length bytes were received."""
+
+
+def part_path_for(file_path):
+    return file_path + PART_SUFFIX
+
+
+def _expected_total(response, offset):
+    """Works out the full size of the file from a 200/206 response, or None if the server does not say."""
+    content_range = response.headers.get("Content-Range")
+    if content_range:
+        match = re.search(r"/(\d+)$", content_range)
+        if match:
+            return int(match.group(1))
+    content_length = response.headers.get("Content-Length")
+    if content_length is None:
+        return None
+    return int(content_length) + (offset if response.status_code == 206 else 0)
+
+
+def _fetch_into_part(session, part_path, url, headers, chunk_size, timeout):
+    """Appends the missing bytes of url to the .part file, raising IncompleteDownload if some are still missing."""
+    offset = os.path.getsize(part_path) if os.path.exists(part_path) else 0
+    request_headers = dict(headers)
+    if offset > 0:
+        request_headers['Range'] = f"bytes={offset}-"
+
+    with session.get(url, headers=request_headers, stream=True, timeout=timeout) as r:
+        if r.status_code == 416:
+            # Nothing left to send: the part file already holds the whole resource.
+            match = re.search(r"/(\d+)$", r.headers.get("Content-Range", ""))
+            if match and int(match.group(1)) == offset:
+                return
+            os.remove(part_path)
+            raise IncompleteDownload(f"Range request rejected for {url}, restarting from scratch")
+        r.raise_for_status()
+
+        if r.status_code == 206:
+            print(f"Resuming {os.path.basename(part_path)} from byte {offset}...")
+            mode = 'ab'
+        else:
+            # The server ignored the Range header and sent the full body.
+            offset = 0
+            mode = 'wb'
+        expected = _expected_total(r, offset)
+
+        with open(part_path, mode) as file:
+            for chunk in r.iter_content(chunk_size=chunk_size):
+                file.write(chunk)
+
+    received = os.path.getsize(part_path)
+    if expected is not None and received != expected:
+        raise IncompleteDownload(f"Got {received} of {expected} bytes for {url}")
+
+
+def download_file(url, file_path, headers, session=None, chunk_size=8192, max_attempts=5, timeout=60):
+    """
+    Downloads url to file_path, resuming after interruptions.
+
+    Bytes are written to `file_path + '.part'`; after a dropped connection or a timeout the transfer
+    continues from the end of the part file with an HTTP Range request. The part file is renamed to
+    file_path only once its size matches the Content-Length announced by the server, so file_path
+    never holds a truncated file. The part file is kept when all attempts fail so the next run can resume.
+    Requests go through `session` when given (see http_session.create_session).
+    """
+    session = session or requests
+    part_path = part_path_for(file_path)
+    for attempt in range(1, max_attempts + 1):
+        try:
+            _fetch_into_part(session, part_path, url, headers, chunk_size, timeout)
+            break
+        except (requests.ConnectionError, requests.Timeout,
+                requests.exceptions.ChunkedEncodingError, IncompleteDownload) as e:
+            if attempt == max_attempts:
+                raise
+            print(f"Transfer of {os.path.basename(file_path)} interrupted ({e}), retrying ({attempt}/{max_attempts})...")
+
+    os.replace(part_path, file_path)
@@ -1,15 +1,24 @@
 import os
 import argparse
 from pydub import AudioSegment
-from pysrt import open as open_srt
-
-
-def make_segment(audio, start_time_ms, end_time_ms, segment_file):
-    # Adding 500ms margin to both sides to ensure that the voice is not cut mid-sentence
-    start_margin = max(0, start_time_ms - 500)  # Ensuring start time is not negative
-    end_margin = min(len(audio), end_time_ms + 500)  # Ensuring end time is not beyond audio length
-    segment = audio[start_margin:end_margin]
-    segment.export(segment_file, format="mp3")
+from pydub.utils import mediainfo
+
+from audio_clips import EpisodeAudio, StreamingEpisodeAudio, copy_clips, encode_clips, encode_clips_once
+from subtitles import read_srt
+
+# Trade exact cut points for speed:
+# pydub: decode with pydub and export every clip with its own ffmpeg process (the original way).
+# pcm:   decode once into a numpy buffer and encode all clips of the episode with one ffmpeg process.
+#        Cuts are exact to the millisecond.
+# copy:  cut the clips out of the MP3 with stream copy in one ffmpeg run, nothing is decoded or
+#        encoded. Cuts land on MP3 frame boundaries (about 26 ms). MP3 input only, other formats
+#        fall back to pcm.
+EXPORT_MODES = ["pcm", "copy", "pydub"]
+# How the pcm mode encodes context clips, which overlap their neighbours by two cues:
+# separate: every clip is encoded on its own, so most audio is encoded about three times.
+# concat:   the episode is encoded once in pieces cut at every clip boundary and the clips are
+#           concatenated from the encoded frames. Cuts are frame accurate (about 26 ms).
+CONTEXT_MODES = ["separate", "concat"]
 
 
 def is_segment_too_small(start_time_ms, end_time_ms, subtitle_text, min_duration_ms, min_text_length):
@@ -26,49 +35,91 @@ def get_audio_segment(audio, start, end):
     return audio[start:end]
 
 
-def create_context_audio_file(audio, start_time_ms, end_time_ms, output_folder, audio_filename, index):
-    context_audio_file = os.path.join(output_folder, audio_filename)
-    context_segment = get_audio_segment(audio, start_time_ms, end_time_ms)
-    context_segment.export(context_audio_file, format="mp3")
-    return context_audio_file
-
-
-def split_audio_by_srt(audio_file, srt_file, output_folder, show_name, min_duration_ms=1000, min_text_length=10):
-    base_name = os.path.splitext(os.path.basename(audio_file))[0]
-    subs = open_srt(srt_file)
-    audio = AudioSegment.from_file(audio_file, format="mp3" if audio_file.endswith(".mp3") else "wav")
-
+def segment_bounds(audio_length_ms, start_time_ms, end_time_ms):
+    # Adding 500ms margin to both sides to ensure that the voice is not cut mid-sentence
+    end_ms = min(audio_length_ms, end_time_ms + 500)
+    # A cue past the end of the audio gives an empty clip rather than one that ends before it starts
+    return min(max(0, start_time_ms - 500), end_ms), end_ms
+
+
+def plan_clips(subs, audio_length_ms, base_name, output_folder, show_name, min_duration_ms=1000, min_text_length=10,
+               cue_indexes=None):
+    """
+    Works out every card of the episode, or only those of the cues at cue_indexes, without touching the audio.
+    Returns the deck rows and the clips to export as (start_ms, end_ms, filepath).
+    """
+    rows = []
+    clips = []
     for index, sub in enumerate(subs):
+        if cue_indexes is not None and index not in cue_indexes:
+            continue
+
         # Calculate the start and end times of the current subtitle
-        start_time_ms = sub.start.ordinal
-        end_time_ms = sub.end.ordinal
+        start_time_ms = sub.start_ms
+        end_time_ms = sub.end_ms
 
         # Handle segment too small
         if is_segment_too_small(start_time_ms, end_time_ms, sub.text, min_duration_ms, min_text_length):
             continue
 
-        # Create main segment with 500ms margin
+        # Main segment with 500ms margin
         segment_audio_filename = f"{base_name}_segment_{index}.mp3"
-        segment_file = os.path.join(output_folder, segment_audio_filename)
-        make_segment(audio, start_time_ms, end_time_ms, segment_file)
+        clips.append((*segment_bounds(audio_length_ms, start_time_ms, end_time_ms),
+                      os.path.join(output_folder, segment_audio_filename)))
 
         # Create context text: previous sub + current sub + next sub
         context = " ".join([get_subtitle_text(subs, index - 1), sub.text, get_subtitle_text(subs, index + 1)])
 
         # Calculate start and end times for context audio segment
-        prev_sub_start_time_ms = 0 if index == 0 else subs[index - 1].start.ordinal
-        next_sub_end_time_ms = len(audio) if index + 1 >= len(subs) else subs[index + 1].end.ordinal
+        prev_sub_start_time_ms = 0 if index == 0 else subs[index - 1].start_ms
+        next_sub_end_time_ms = audio_length_ms if index + 1 >= len(subs) else subs[index + 1].end_ms
 
-        # Create context audio file
         context_audio_filename = f"{base_name}_context_{index}.mp3"
-        create_context_audio_file(audio, prev_sub_start_time_ms, next_sub_end_time_ms,
-                                                       output_folder, context_audio_filename, index)
+        clips.append((min(prev_sub_start_time_ms, next_sub_end_time_ms), next_sub_end_time_ms,
+                      os.path.join(output_folder, context_audio_filename)))
 
-        # Print output
         timing = f"{sub.start} --> {sub.end}"
-        print(
-            f"{sub.text}\t[Sound:{segment_audio_filename}]\t{context}\t[Sound:{context_audio_filename}]\t{base_name}\t{timing}\t{show_name}")
-
+        rows.append(f"{sub.text}\t[Sound:{segment_audio_filename}]\t{context}\t[Sound:{context_audio_filename}]\t"
+                    f"{base_name}\t{timing}\t{show_name}")
+    return rows, clips
+
+
+def split_audio_by_srt(audio_file, srt_file, output_folder, show_name, min_duration_ms=1000, min_text_length=10,
+                       export_mode="pcm", context_mode="separate", window_decode=False, cue_indexes=None):
+    """
+    Exports the audio clips of every card of the episode and returns the deck rows (tab-separated lines).
+    With window_decode the pcm mode decodes a sliding window around the clips being encoded instead
+    of the whole episode, so memory does not grow with the length of the episode.
+    cue_indexes limits the cards to the cues at these positions in the SRT (see transcript_search.py).
+    """
+    base_name = os.path.splitext(os.path.basename(audio_file))[0]
+    subs = read_srt(srt_file)
+
+    if export_mode == "pydub":
+        audio = AudioSegment.from_file(audio_file, format="mp3" if audio_file.endswith(".mp3") else "wav")
+        rows, clips = plan_clips(subs, len(audio), base_name, output_folder, show_name, min_duration_ms,
+                                 min_text_length, cue_indexes)
+        for start_ms, end_ms, clip_file in clips:
+            get_audio_segment(audio, start_ms, end_ms).export(clip_file, format="mp3")
+    elif export_mode == "copy" and audio_file.endswith(".mp3"):
+        audio_length_ms = int(float(mediainfo(audio_file)["duration"]) * 1000)
+        rows, clips = plan_clips(subs, audio_length_ms, base_name, output_folder, show_name, min_duration_ms,
+                                 min_text_length, cue_indexes)
+        copy_clips(audio_file, clips)
+    else:
+        audio = StreamingEpisodeAudio(audio_file) if window_decode else EpisodeAudio.decode(audio_file)
+        rows, clips = plan_clips(subs, len(audio), base_name, output_folder, show_name, min_duration_ms,
+                                 min_text_length, cue_indexes)
+        try:
+            if context_mode == "concat":
+                encode_clips_once(audio, clips)
+            else:
+                encode_clips(audio, clips)
+        finally:
+            if window_decode:
+                audio.close()
+
+    return rows
 
 
 if __name__ == "__main__":
@@ -80,6 +131,21 @@ if __name__ == "__main__":
     parser.add_argument('--show_name', type=str, required=True, help='Name of the show.')
     parser.add_argument('--min_duration_ms', type=int, default=1000, help='Minimum duration of a segment in milliseconds.')
     parser.add_argument('--min_text_length', type=int, default=10, help='Minimum length of subtitle text for a segment.')
+    parser.add_argument('--export_mode', choices=EXPORT_MODES, default="pcm",
+                        help='pcm: decode once and encode all clips with one ffmpeg process (exact cuts); '
+                             'copy: cut the MP3 with stream copy, no re-encoding (cuts on ~26 ms frame boundaries); '
+                             'pydub: export every clip with its own ffmpeg process.')
+    parser.add_argument('--context_mode', choices=CONTEXT_MODES, default="separate",
+                        help='separate: encode every clip on its own; concat: encode the episode once and build the '
+                             'overlapping context clips from the shared encoded frames (pcm mode only).')
+    parser.add_argument('--window_decode', action='store_true',
+                        help='Decode only a sliding window around the current clips instead of the whole episode, '
+                             'keeping memory bounded for very long episodes (pcm mode only).')
 
     args = parser.parse_args()
-    split_audio_by_srt(args.audio_file, args.srt_file, args.output_folder, args.show_name, args.min_duration_ms, args.min_text_length)
+    rows = split_audio_by_srt(args.audio_file, args.srt_file, args.output_folder, args.show_name, args.min_duration_ms,
+                              args.min_text_length, args.export_mode, args.context_mode,
+                              args.window_decode)
+    # Print output
+    for row in rows:
+        print(row)
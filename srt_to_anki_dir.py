@@ -1,17 +1,25 @@
 import os
+import sys
 import argparse
-import subprocess
+import traceback
 from concurrent.futures import ProcessPoolExecutor
 
+from srt_to_anki import CONTEXT_MODES, EXPORT_MODES, split_audio_by_srt
+
+
 def process_file_pair(args):
-    mp3_path, srt_path, output_folder, show_name = args
-    subprocess.run(['python3', 'srt_to_anki.py',
-                    '--audio_file', mp3_path,
-                    '--srt_file', srt_path,
-                    '--output_folder', output_folder,
-                    '--show_name', show_name])
-
-def process_directory(directory, show_name, output_folder, error_log_path, num_processes):
+    """Runs split_audio_by_srt for one episode in a pool worker. Returns (mp3_path, rows, error)."""
+    mp3_path, srt_path, output_folder, show_name, export_mode, context_mode, window_decode = args
+    try:
+        rows = split_audio_by_srt(mp3_path, srt_path, output_folder, show_name, export_mode=export_mode,
+                                  context_mode=context_mode, window_decode=window_decode)
+        return mp3_path, rows, None
+    except Exception:
+        return mp3_path, [], traceback.format_exc()
+
+
+def process_directory(directory, show_name, output_folder, error_log_path, num_processes, deck_path=None,
+                      export_mode="pcm", context_mode="separate", window_decode=False):
     # Get all files in the directory
     files = os.listdir(directory)
 
@@ -31,10 +39,24 @@ def process_directory(directory, show_name, output_folder, error_log_path, num_p
 
             mp3_path = os.path.join(directory, mp3)
             srt_path = os.path.join(directory, srt)
-            tasks.append((mp3_path, srt_path, output_folder, show_name))
+            tasks.append((mp3_path, srt_path, output_folder, show_name, export_mode, context_mode, window_decode))
+
+        # The workers import pydub once and hand their rows back; the deck is written here, in
+        # episode order, whatever order the episodes finish in.
+        deck = open(deck_path, 'w', encoding='utf-8') if deck_path else sys.stdout
+        try:
+            with ProcessPoolExecutor(max_workers=num_processes) as executor:
+                for mp3_path, rows, error in executor.map(process_file_pair, tasks):
+                    if error:
+                        error_log.write(f"Failed to process {mp3_path}:\n{error}\n")
+                        print(f"Failed to process {mp3_path}, see {error_log_path}", file=sys.stderr)
+                        continue
+                    for row in rows:
+                        deck.write(row + "\n")
+        finally:
+            if deck is not sys.stdout:
+                deck.close()
 
-        with ProcessPoolExecutor(max_workers=num_processes) as executor:
-            list(executor.map(process_file_pair, tasks))
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description='Process all MP3 and SRT pairs in a directory and output the results in tab-separated format.')
@@ -43,6 +65,14 @@ if __name__ == "__main__":
     parser.add_argument('--output_folder', type=str, required=True, help='Folder to save the split audio segments.')
     parser.add_argument('--error_log', type=str, default='error_log.txt', help='Path to the error log file.')
     parser.add_argument('--num_processes', type=int, default=4, help='Number of parallel processes to run.')
+    parser.add_argument('--deck_file', type=str, default=None,
+                        help='Write the tab-separated deck to this file instead of standard output.')
+    parser.add_argument('--export_mode', choices=EXPORT_MODES, default="pcm", help='See srt_to_anki.py.')
+    parser.add_argument('--context_mode', choices=CONTEXT_MODES, default="separate", help='See srt_to_anki.py.')
+    parser.add_argument('--window_decode', action='store_true',
+                        help='Decode a sliding window instead of whole episodes, see srt_to_anki.py. Recommended '
+                             'with several processes and long episodes.')
 
     args = parser.parse_args()
-    process_directory(args.directory, args.show_name, args.output_folder, args.error_log, args.num_processes)
+    process_directory(args.directory, args.show_name, args.output_folder, args.error_log, args.num_processes,
+                      args.deck_file, args.export_mode, args.context_mode, args.window_decode)
@@ -0,0 +1,155 @@
+import argparse
+import glob
+import os
+import re
+import time
+
+# "00:01:02,340 --> 00:01:05,120", whisper and some editors write a dot before the milliseconds.
+TIMING_LINE = re.compile(r'^\s*(\d+):(\d\d):(\d\d)[,.](\d{3})\s*-->\s*(\d+):(\d\d):(\d\d)[,.](\d{3})')
+INDEX_LINE = re.compile(r'^\d+$')
+
+
+class Cue:
+    """One subtitle: its number in the file, start and end in milliseconds and its text lines joined by newlines."""
+    __slots__ = ("index", "start_ms", "end_ms", "text")
+
+    def __init__(self, index, start_ms, end_ms, text):
+        self.index = index
+        self.start_ms = start_ms
+        self.end_ms = end_ms
+        self.text = text
+
+    @property
+    def start(self):
+        return format_timestamp(self.start_ms)
+
+    @property
+    def end(self):
+        return format_timestamp(self.end_ms)
+
+    def __repr__(self):
+        return f"Cue({self.index}, {self.start} --> {self.end}, {self.text!r})"
+
+
+def parse_timing(line):
+    """Returns (start_ms, end_ms) for a timing line, or None for any other line."""
+    match = TIMING_LINE.match(line)
+    if not match:
+        return None
+    h1, m1, s1, ms1, h2, m2, s2, ms2 = match.groups()
+    start_ms = ((int(h1) * 60 + int(m1)) * 60 + int(s1)) * 1000 + int(ms1)
+    end_ms = ((int(h2) * 60 + int(m2)) * 60 + int(s2)) * 1000 + int(ms2)
+    return start_ms, end_ms
+
+
+def parse_cues(lines):
+    """
+    Yields the Cues of an SRT file as its lines are read, so a file handle is never read into
+    memory as a whole. Accepts CRLF line ends, a byte order mark, any number of blank lines between
+    cues and cues without a number. Blocks without a timing line are skipped.
+    """
+    index = None
+    timing = None
+    text = []
+    count = 0
+    for line in lines:
+        line = line.rstrip().lstrip('\ufeff')
+        if timing is not None:
+            if line:
+                text.append(line)
+                continue
+            count += 1
+            yield Cue(count if index is None else index, timing[0], timing[1], '\n'.join(text))
+            index = None
+            timing = None
+            text = []
+        elif not line:
+            index = None
+        elif INDEX_LINE.match(line):
+            index = int(line)
+        else:
+            # A timing line starts the cue; anything else outside a cue is garbage and ignored.
+            timing = parse_timing(line)
+    if timing is not None:
+        count += 1
+        yield Cue(count if index is None else index, timing[0], timing[1], '\n'.join(text))
+
+
+def iter_srt(srt_filepath):
+    """Yields the Cues of an SRT file, reading it line by line."""
+    with open(srt_filepath, 'r', encoding='utf-8-sig', errors='replace') as f:
+        yield from parse_cues(f)
+
+
+def read_srt(srt_filepath):
+    """All Cues of an SRT file as a list, for callers that need to look at neighbouring cues."""
+    return list(iter_srt(srt_filepath))
+
+
+def format_timestamp(ms):
+    hours, ms = divmod(ms, 3600000)
+    minutes, ms = divmod(ms, 60000)
+    seconds, ms = divmod(ms, 1000)
+    return f"{hours:02d}:{minutes:02d}:{seconds:02d},{ms:03d}"
+
+
+def write_srt(srt_filepath, cues):
+    """
+    Writes anything with start_ms, end_ms and text (Cues, whisper Segments) as an SRT file,
+    numbering the cues from 1. The file is written next to its destination and renamed into place,
+    so the SRT is either complete or absent.
+    """
+    temp_filepath = f"{srt_filepath}.tmp"
+    with open(temp_filepath, 'w', encoding='utf-8') as f:
+        for index, cue in enumerate(cues, 1):
+            f.write(f"{index}\n{format_timestamp(cue.start_ms)} --> {format_timestamp(cue.end_ms)}\n{cue.text}\n\n")
+    os.replace(temp_filepath, srt_filepath)
+
+
+def srt_files(inputs):
+    """The .srt files named by a list of files, directories and glob patterns."""
+    paths = []
+    for pattern in inputs:
+        if os.path.isdir(pattern):
+            paths.extend(sorted(glob.glob(os.path.join(pattern, '**', '*.srt'), recursive=True)))
+        else:
+            paths.extend(sorted(glob.glob(pattern)) or [pattern])
+    return paths
+
+
+def benchmark(paths, repeat=3):
+    """Times this parser against pysrt on the same files and checks that both find the same cues."""
+    import pysrt
+
+    def best_of(parse):
+        times = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            result = [parse(path) for path in paths]
+            times.append(time.perf_counter() - started)
+        return min(times), result
+
+    ours_seconds, ours = best_of(read_srt)
+    pysrt_seconds, theirs = best_of(pysrt.open)
+    cue_count = sum(len(cues) for cues in ours)
+    mismatches = [path for path, cues, subs in zip(paths, ours, theirs)
+                  if [(c.start_ms, c.end_ms, c.text) for c in cues] !=
+                  [(s.start.ordinal, s.end.ordinal, s.text) for s in subs]]
+    print(f"{len(paths)} files, {cue_count} cues")
+    print(f"subtitles: {ours_seconds:.3f} s ({cue_count / ours_seconds:,.0f} cues/s)")
+    print(f"pysrt:     {pysrt_seconds:.3f} s ({cue_count / pysrt_seconds:,.0f} cues/s), "
+          f"{pysrt_seconds / ours_seconds:.1f}x slower")
+    for path in mismatches:
+        print(f"Parsed differently from pysrt: {path}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the SRT parser against pysrt.")
+    parser.add_argument('inputs', nargs='+', help="SRT files, directories or glob patterns.")
+    parser.add_argument('--repeat', type=int, default=3, help="Runs per parser, the best one counts.")
+    args = parser.parse_args()
+    benchmark(srt_files(args.inputs), args.repeat)
+
+
+if __name__ == "__main__":
+    main()
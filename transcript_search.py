@@ -0,0 +1,227 @@
+import argparse
+import os
+import sqlite3
+import sys
+import unicodedata
+from collections import namedtuple
+
+from srt_to_anki import EXPORT_MODES, split_audio_by_srt
+from subtitles import format_timestamp, iter_srt
+
+# Transcripts are Japanese, without spaces between words, so the index holds every pair of
+# consecutive characters (bigram) of a cue instead of words. The last character of a cue is also
+# indexed on its own, so that every single character is the start of some gram.
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS episodes (
+    id INTEGER PRIMARY KEY,
+    path TEXT NOT NULL UNIQUE,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS cues (
+    episode_id INTEGER NOT NULL,
+    cue_index INTEGER NOT NULL,
+    start_ms INTEGER NOT NULL,
+    end_ms INTEGER NOT NULL,
+    text TEXT NOT NULL,
+    PRIMARY KEY (episode_id, cue_index)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS postings (
+    gram TEXT NOT NULL,
+    episode_id INTEGER NOT NULL,
+    cue_index INTEGER NOT NULL,
+    PRIMARY KEY (gram, episode_id, cue_index)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS grams (
+    gram TEXT PRIMARY KEY,
+    cue_count INTEGER NOT NULL
+) WITHOUT ROWID;
+"""
+# A phrase is looked up through its rarest grams only, the cues they share are few enough to check directly.
+QUERY_GRAMS = 2
+
+# cue_index is the position of the cue in its SRT, counting from 0, as srt_to_anki.py numbers its clips.
+Hit = namedtuple("Hit", ["srt_path", "cue_index", "start_ms", "end_ms", "text"])
+
+
+def normalize(text):
+    """Folds full-width and half-width forms and case, and drops whitespace, for indexing and matching."""
+    return "".join(unicodedata.normalize("NFKC", text).lower().split())
+
+
+def grams(normalized_text):
+    """The distinct grams of a normalized text: its bigrams and its last character."""
+    if not normalized_text:
+        return set()
+    result = {normalized_text[i:i + 2] for i in range(len(normalized_text) - 1)}
+    result.add(normalized_text[-1])
+    return result
+
+
+def transcript_files(directory_paths):
+    """Finished transcripts under the given directories. _buggy.srt files are left out until they are redone."""
+    for directory_path in directory_paths:
+        for root, _, files in os.walk(directory_path):
+            for name in sorted(files):
+                if name.endswith(".srt") and not name.endswith("_buggy.srt"):
+                    yield os.path.abspath(os.path.join(root, name))
+
+
+class TranscriptIndex:
+    """
+    SQLite inverted index of the cues of an SRT archive. update() re-reads only the transcripts
+    that appeared or changed since the last run, search() finds a phrase by intersecting the
+    postings of its rarest grams and checking the few remaining cues.
+    """
+
+    def __init__(self, db_path):
+        self.conn = sqlite3.connect(db_path)
+        with self.conn:
+            self.conn.executescript(SCHEMA)
+
+    def update(self, directory_paths):
+        """Indexes new and changed transcripts under directory_paths and forgets the deleted ones. Returns (added, removed)."""
+        roots = [os.path.join(os.path.abspath(path), "") for path in directory_paths]
+        known = {row[1]: row for row in self.conn.execute("SELECT id, path, size, mtime_ns FROM episodes")}
+        seen = set()
+        added = 0
+        for srt_path in transcript_files(directory_paths):
+            seen.add(srt_path)
+            stat = os.stat(srt_path)
+            previous = known.get(srt_path)
+            if previous and previous[2] == stat.st_size and previous[3] == stat.st_mtime_ns:
+                continue
+            with self.conn:
+                if previous:
+                    self._remove(previous[0])
+                self._add(srt_path, stat)
+            added += 1
+
+        removed = [row[0] for path, row in known.items()
+                   if path not in seen and any(path.startswith(root) for root in roots)]
+        with self.conn:
+            for episode_id in removed:
+                self._remove(episode_id)
+        return added, len(removed)
+
+    def _add(self, srt_path, stat):
+        episode_id = self.conn.execute("INSERT INTO episodes (path, size, mtime_ns) VALUES (?, ?, ?)",
+                                       (srt_path, stat.st_size, stat.st_mtime_ns)).lastrowid
+        cues = []
+        postings = []
+        for cue_index, cue in enumerate(iter_srt(srt_path)):
+            cues.append((episode_id, cue_index, cue.start_ms, cue.end_ms, cue.text))
+            postings.extend((gram, episode_id, cue_index) for gram in grams(normalize(cue.text)))
+        self.conn.executemany("INSERT INTO cues VALUES (?, ?, ?, ?, ?)", cues)
+        self.conn.executemany("INSERT INTO postings VALUES (?, ?, ?)", postings)
+        self.conn.executemany("INSERT INTO grams VALUES (?, 1) ON CONFLICT (gram) DO UPDATE SET cue_count = cue_count + 1",
+                              [(gram,) for gram, _, _ in postings])
+
+    def _remove(self, episode_id):
+        # Postings are keyed by gram, so they are deleted through the grams of the stored cue texts.
+        rows = self.conn.execute("SELECT cue_index, text FROM cues WHERE episode_id = ?", (episode_id,)).fetchall()
+        postings = [(gram, episode_id, cue_index) for cue_index, text in rows for gram in grams(normalize(text))]
+        self.conn.executemany("DELETE FROM postings WHERE gram = ? AND episode_id = ? AND cue_index = ?", postings)
+        self.conn.executemany("UPDATE grams SET cue_count = cue_count - 1 WHERE gram = ?",
+                              [(gram,) for gram, _, _ in postings])
+        self.conn.execute("DELETE FROM cues WHERE episode_id = ?", (episode_id,))
+        self.conn.execute("DELETE FROM episodes WHERE id = ?", (episode_id,))
+
+    def search(self, query, limit=None):
+        """Every cue containing query (compared after normalize()), in episode and cue order."""
+        needle = normalize(query)
+        if not needle:
+            return []
+        if len(needle) == 1:
+            # Every gram starting with the character.
+            candidates = ("SELECT DISTINCT episode_id, cue_index FROM postings WHERE gram >= ? AND gram < ?",
+                          [needle, needle + "\U0010ffff"])
+        else:
+            query_grams = sorted(grams(needle) - {needle[-1]})
+            placeholders = ",".join("?" * len(query_grams))
+            counts = dict(self.conn.execute(f"SELECT gram, cue_count FROM grams WHERE gram IN ({placeholders})",
+                                            query_grams).fetchall())
+            if len(counts) < len(query_grams) or 0 in counts.values():
+                return []
+            query_grams = sorted(query_grams, key=counts.get)[:QUERY_GRAMS]
+            candidates = (" INTERSECT ".join(["SELECT episode_id, cue_index FROM postings WHERE gram = ?"] *
+                                             len(query_grams)), query_grams)
+        rows = self.conn.execute(
+            "SELECT e.path, c.cue_index, c.start_ms, c.end_ms, c.text "
+            f"FROM ({candidates[0]}) AS p "
+            "JOIN cues AS c ON c.episode_id = p.episode_id AND c.cue_index = p.cue_index "
+            "JOIN episodes AS e ON e.id = c.episode_id "
+            "ORDER BY e.path, c.cue_index", candidates[1])
+        hits = []
+        for row in rows:
+            # Sharing all grams does not make them consecutive: check the phrase itself.
+            if needle in normalize(row[4]):
+                hits.append(Hit(*row))
+                if limit and len(hits) >= limit:
+                    break
+        return hits
+
+    def close(self):
+        self.conn.close()
+
+
+def export_hits(hits, output_folder, show_name, export_mode="pcm", min_duration_ms=0, min_text_length=0):
+    """
+    Cuts Anki cards for the hits with the splitter, one run per episode, and returns the deck rows.
+    The cues were picked by hand, so unlike a whole-episode deck no cue is too short by default.
+    """
+    rows = []
+    by_episode = {}
+    for hit in hits:
+        by_episode.setdefault(hit.srt_path, set()).add(hit.cue_index)
+    for srt_path, cue_indexes in by_episode.items():
+        mp3_path = os.path.splitext(srt_path)[0] + ".mp3"
+        if not os.path.exists(mp3_path):
+            print(f"Missing audio for {srt_path}", file=sys.stderr)
+            continue
+        episode_rows = split_audio_by_srt(mp3_path, srt_path, output_folder, show_name, min_duration_ms,
+                                          min_text_length, export_mode=export_mode, cue_indexes=cue_indexes)
+        if len(episode_rows) < len(cue_indexes):
+            print(f"{len(cue_indexes) - len(episode_rows)} of {len(cue_indexes)} cues of {srt_path} were too short "
+                  f"for a card, see --min_duration_ms and --min_text_length", file=sys.stderr)
+        rows.extend(episode_rows)
+    return rows
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Search the SRT archive for a phrase.")
+    parser.add_argument("db", type=str, help="Path of the index SQLite file.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    update_parser = commands.add_parser("update", help="Index new and changed SRT files.")
+    update_parser.add_argument("directories", nargs="+", help="Directories to scan for .srt files, recursively.")
+    search_parser = commands.add_parser("search", help="Print every cue containing the phrase.")
+    search_parser.add_argument("query", type=str, help="Phrase to look for.")
+    search_parser.add_argument("--limit", type=int, default=None, help="Stop after this many cues.")
+    search_parser.add_argument("--anki_output_folder", type=str, default=None,
+                               help="Cut Anki cards for the cues found into this folder and print the deck "
+                                    "instead, see srt_to_anki.py. The MP3 must sit next to its SRT.")
+    search_parser.add_argument("--show_name", type=str, default="", help="Name of the show, for the deck.")
+    search_parser.add_argument("--export_mode", choices=EXPORT_MODES, default="pcm", help="See srt_to_anki.py.")
+    search_parser.add_argument("--min_duration_ms", type=int, default=0,
+                               help="Skip cues shorter than this when cutting cards, see srt_to_anki.py.")
+    search_parser.add_argument("--min_text_length", type=int, default=0,
+                               help="Skip cues with less text than this when cutting cards, see srt_to_anki.py.")
+    args = parser.parse_args()
+
+    index = TranscriptIndex(args.db)
+    try:
+        if args.command == "update":
+            added, removed = index.update(args.directories)
+            print(f"Transcript index: {added} new or changed episodes, {removed} removed episodes.")
+        else:
+            hits = index.search(args.query, args.limit)
+            if args.anki_output_folder:
+                for row in export_hits(hits, args.anki_output_folder, args.show_name, args.export_mode,
+                                       args.min_duration_ms, args.min_text_length):
+                    print(row)
+            else:
+                for hit in hits:
+                    text = hit.text.replace("\n", " ")
+                    print(f"{hit.srt_path}\t{hit.cue_index}\t{format_timestamp(hit.start_ms)}\t{text}")
+    finally:
+        index.close()
@@ -0,0 +1,291 @@
+import argparse
+import json
+import os
+import struct
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+# Bitrates in kbit/s by bitrate index, for (MPEG version 1, layer) and (MPEG version 2/2.5, layer).
+BITRATES = {
+    (1, 1): [0, 32, 64, 96, 128, 160, 192, 224, 256, 288, 320, 352, 384, 416, 448],
+    (1, 2): [0, 32, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320, 384],
+    (1, 3): [0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320],
+    (2, 1): [0, 32, 48, 56, 64, 80, 96, 112, 128, 144, 160, 176, 192, 224, 256],
+    (2, 2): [0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160],
+    (2, 3): [0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160],
+}
+SAMPLE_RATES = {1: [44100, 48000, 32000], 2: [22050, 24000, 16000], 2.5: [11025, 12000, 8000]}
+
+# How much of the file is read after the ID3 tag to find the first frame and its Xing/VBRI header.
+HEADER_BYTES = 4096
+
+# In order of preference: the pipeline keeps the WAV it transcribed next to the MP3 by default.
+AUDIO_EXTENSIONS = (".mp3", ".wav")
+DEFAULT_CACHE_PATH = os.path.expanduser("~/.cache/audio_durations.json")
+# DurationCache.get() for a file it has no valid entry for. A cached None means unreadable headers.
+MISSING = object()
+
+
+def _id3v2_size(header):
+    """Size of the ID3v2 tag at the start of the file (0 if there is none)."""
+    if len(header) < 10 or header[:3] != b"ID3":
+        return 0
+    size = (header[6] << 21) | (header[7] << 14) | (header[8] << 7) | header[9]
+    footer = 10 if header[5] & 0x10 else 0
+    return 10 + size + footer
+
+
+def _parse_frame_header(data, offset):
+    """Returns (version, layer, bitrate_kbps, sample_rate, mono) for a valid MPEG frame header, else None."""
+    b1, b2, b3 = data[offset + 1], data[offset + 2], data[offset + 3]
+    if data[offset] != 0xFF or b1 & 0xE0 != 0xE0:
+        return None
+    version = {0: 2.5, 2: 2, 3: 1}.get((b1 >> 3) & 0x03)
+    layer = {1: 3, 2: 2, 3: 1}.get((b1 >> 1) & 0x03)
+    bitrate_index = b2 >> 4
+    sample_rate_index = (b2 >> 2) & 0x03
+    if version is None or layer is None or bitrate_index in (0, 15) or sample_rate_index == 3:
+        return None
+    bitrate = BITRATES[(1 if version == 1 else 2, layer)][bitrate_index]
+    return version, layer, bitrate, SAMPLE_RATES[version][sample_rate_index], (b3 >> 6) == 3
+
+
+def _samples_per_frame(version, layer):
+    if layer == 1:
+        return 384
+    if layer == 3 and version != 1:
+        return 576
+    return 1152
+
+
+def mp3_duration(path):
+    """
+    Duration of an MP3 in seconds, read from its headers without decoding: the frame count of a
+    Xing/Info or VBRI header when there is one, otherwise the audio size divided by the bitrate of
+    the first frame (exact for CBR files). Only the ID3 header and the next few KB are read.
+    Returns None when no MPEG frame is found.
+    """
+    size = os.path.getsize(path)
+    with open(path, 'rb') as f:
+        audio_start = _id3v2_size(f.read(10))
+        f.seek(audio_start)
+        data = f.read(HEADER_BYTES)
+        if size > 128:
+            f.seek(size - 128)
+            has_id3v1 = f.read(3) == b"TAG"
+        else:
+            has_id3v1 = False
+
+    for offset in range(len(data) - 4):
+        frame = _parse_frame_header(data, offset)
+        if frame:
+            break
+    else:
+        return None
+    version, layer, bitrate, sample_rate, mono = frame
+    samples = _samples_per_frame(version, layer)
+
+    # The Xing/Info header sits right after the side information of the first frame.
+    side_info = (17 if mono else 32) if version == 1 else (9 if mono else 17)
+    xing = offset + 4 + side_info
+    if data[xing:xing + 4] in (b"Xing", b"Info") and len(data) >= xing + 12:
+        flags = struct.unpack(">I", data[xing + 4:xing + 8])[0]
+        if flags & 0x1:
+            frames = struct.unpack(">I", data[xing + 8:xing + 12])[0]
+            return frames * samples / sample_rate
+
+    # The VBRI header (Fraunhofer encoders) always starts 32 bytes after the frame header.
+    vbri = offset + 4 + 32
+    if data[vbri:vbri + 4] == b"VBRI" and len(data) >= vbri + 18:
+        frames = struct.unpack(">I", data[vbri + 14:vbri + 18])[0]
+        return frames * samples / sample_rate
+
+    audio_bytes = size - audio_start - offset - (128 if has_id3v1 else 0)
+    return audio_bytes * 8 / (bitrate * 1000)
+
+
+def wav_duration(path):
+    """
+    Duration of a WAV in seconds from its fmt and data chunks. A data size left unset by a
+    streaming writer (0 or 0xFFFFFFFF) is replaced by the rest of the file. Returns None for
+    anything that is not a RIFF/WAVE file.
+    """
+    size = os.path.getsize(path)
+    with open(path, 'rb') as f:
+        header = f.read(12)
+        if len(header) < 12 or header[:4] != b"RIFF" or header[8:12] != b"WAVE":
+            return None
+        byte_rate = None
+        while True:
+            chunk = f.read(8)
+            if len(chunk) < 8:
+                return None
+            chunk_id, chunk_size = chunk[:4], struct.unpack("<I", chunk[4:])[0]
+            if chunk_id == b"fmt ":
+                fmt = f.read(chunk_size + (chunk_size & 1))
+                byte_rate = struct.unpack("<I", fmt[8:12])[0]
+            elif chunk_id == b"data":
+                if not byte_rate:
+                    return None
+                if chunk_size in (0, 0xFFFFFFFF):
+                    chunk_size = size - f.tell()
+                return min(chunk_size, size - f.tell()) / byte_rate
+            else:
+                f.seek(chunk_size + (chunk_size & 1), os.SEEK_CUR)
+
+
+def audio_duration(path):
+    """Duration of an MP3 or WAV in seconds read from its headers, or None if it cannot be determined."""
+    try:
+        if path.lower().endswith(".wav"):
+            return wav_duration(path)
+        return mp3_duration(path)
+    except (OSError, struct.error, IndexError):
+        return None
+
+
+class DurationCache:
+    """
+    Durations already read, keyed by path and only valid while the file keeps the same size and
+    mtime, stored as JSON so a warm inventory of the whole archive only needs a stat per file.
+    """
+
+    def __init__(self, cache_path):
+        self.cache_path = cache_path
+        self.lock = threading.Lock()
+        self.changed = False
+        try:
+            with open(cache_path, "r", encoding="utf-8") as f:
+                self.entries = json.load(f)
+        except (OSError, ValueError):
+            self.entries = {}
+
+    def get(self, path, stat):
+        entry = self.entries.get(path)
+        if entry and entry[0] == stat.st_size and entry[1] == stat.st_mtime_ns:
+            return entry[2]
+        return MISSING
+
+    def put(self, path, stat, duration):
+        with self.lock:
+            self.entries[path] = [stat.st_size, stat.st_mtime_ns, duration]
+            self.changed = True
+
+    def save(self):
+        if not self.changed:
+            return
+        os.makedirs(os.path.dirname(os.path.abspath(self.cache_path)), exist_ok=True)
+        temp_path = f"{self.cache_path}.tmp"
+        with self.lock:
+            with open(temp_path, "w", encoding="utf-8") as f:
+                json.dump(self.entries, f, separators=(",", ":"))
+            os.replace(temp_path, self.cache_path)
+            self.changed = False
+
+
+def scan_durations(paths, cache=None, workers=8):
+    """
+    Durations of many files, {path: seconds or None}. Cached durations are reused, the others are
+    read from the headers in a thread pool (the reads are small and mostly wait on the disk).
+    """
+    durations = {}
+    missing = []
+    for path in paths:
+        if cache is None:
+            missing.append((path, None))
+            continue
+        stat = os.stat(path)
+        duration = cache.get(path, stat)
+        if duration is MISSING:
+            missing.append((path, stat))
+        else:
+            durations[path] = duration
+
+    def read(item):
+        path, stat = item
+        duration = audio_duration(path)
+        if cache is not None:
+            cache.put(path, stat, duration)
+        return path, duration
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        durations.update(executor.map(read, missing))
+    if cache is not None:
+        cache.save()
+    return durations
+
+
+def audio_files(directory_path):
+    """
+    One audio file per episode under directory_path, as absolute paths: the MP3, or the WAV when
+    there is no MP3 of the same name.
+    """
+    for root, dirs, files in os.walk(os.path.abspath(directory_path)):
+        dirs.sort()
+        episodes = {}
+        for name in files:
+            base, extension = os.path.splitext(name)
+            extension = extension.lower()
+            if extension not in AUDIO_EXTENSIONS:
+                continue
+            if base not in episodes or AUDIO_EXTENSIONS.index(extension) < AUDIO_EXTENSIONS.index(episodes[base][0]):
+                episodes[base] = (extension, name)
+        for base in sorted(episodes):
+            yield os.path.join(root, episodes[base][1])
+
+
+def inventory(directory_path, durations, stages):
+    """
+    Totals in seconds per show (the first directory level below directory_path, files right in it
+    count for the directory itself) and per stage, plus the files whose duration is unknown.
+    """
+    root = os.path.abspath(directory_path)
+    shows = {}
+    by_stage = {}
+    unknown = []
+    for path, duration in durations.items():
+        if duration is None:
+            unknown.append(path)
+            continue
+        relative = os.path.relpath(path, root).split(os.sep)
+        show = relative[0] if len(relative) > 1 else os.path.basename(root)
+        shows[show] = shows.get(show, 0) + duration
+        by_stage[stages[path]] = by_stage.get(stages[path], 0) + duration
+    return shows, by_stage, unknown
+
+
+def format_hours(seconds):
+    return f"{seconds:.0f} seconds ({seconds / 3600:.2f} hours)"
+
+
+if __name__ == "__main__":
+    from jobs import JobStore, stage_on_disk
+
+    parser = argparse.ArgumentParser(description="Total audio duration of an archive, per show and per stage.")
+    parser.add_argument("directory", type=str, help="Directory to scan for MP3 and WAV files, recursively.")
+    parser.add_argument("--cache", type=str, default=DEFAULT_CACHE_PATH,
+                        help="JSON file of durations already read, reused while a file keeps its size and mtime.")
+    parser.add_argument("--jobs_db", type=str, default=None,
+                        help="Take the stages from this job store instead of the SRT files next to the audio.")
+    parser.add_argument("--workers", type=int, default=8, help="Threads reading headers on a cold cache.")
+    args = parser.parse_args()
+
+    paths = list(audio_files(args.directory))
+    durations = scan_durations(paths, DurationCache(args.cache), args.workers)
+    stored = {}
+    if args.jobs_db:
+        store = JobStore(args.jobs_db)
+        stored = store.stages()
+        store.close()
+    stages = {path: stored.get(path) or stage_on_disk(path) for path in paths}
+
+    shows, by_stage, unknown = inventory(args.directory, durations, stages)
+    print("Per show:")
+    for show, seconds in sorted(shows.items()):
+        print(f"  {show}: {format_hours(seconds)}")
+    print("Per stage:")
+    for stage, seconds in sorted(by_stage.items()):
+        print(f"  {stage}: {format_hours(seconds)}")
+    if unknown:
+        print(f"Unknown duration: {len(unknown)} files, e.g. {unknown[0]}")
+    print(f"Total duration: {format_hours(sum(shows.values()))}")
@@ -0,0 +1,132 @@
+import os
+import shutil
+import tempfile
+import wave
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from loop_guard import Segment
+from supervisor import Supervisor
+
+SAMPLE_RATE = 16000
+
+
+def decode_pcm(audio_filepath, ffmpeg, sample_rate=SAMPLE_RATE):
+    """
+    Decodes an audio file to 16-bit mono PCM at sample_rate and returns it as a numpy int16 array.
+    ffmpeg is the Supervisor whose limits the decoder runs under.
+    """
+    cmd = [
+        "ffmpeg",
+        "-nostdin",
+        "-threads", "0",
+        "-i", audio_filepath,
+        "-f", "s16le",
+        "-ac", "1",
+        "-acodec", "pcm_s16le",
+        "-ar", str(sample_rate),
+        "pipe:1"
+    ]
+    output = ffmpeg.run(cmd).stdout
+    return np.frombuffer(output, dtype=np.int16)
+
+
+def frame_energy(pcm, frame_len):
+    """RMS energy of consecutive frames of frame_len samples."""
+    count = len(pcm) // frame_len
+    frames = pcm[:count * frame_len].reshape(count, frame_len).astype(np.float32)
+    return np.sqrt((frames * frames).mean(axis=1))
+
+
+def _longest_run_center(mask):
+    """Index of the middle of the longest run of True in mask, or None if there is none."""
+    if not mask.any():
+        return None
+    padded = np.concatenate(([False], mask, [False])).astype(np.int8)
+    edges = np.flatnonzero(np.diff(padded))
+    starts, ends = edges[::2], edges[1::2]
+    longest = np.argmax(ends - starts)
+    return (starts[longest] + ends[longest]) // 2
+
+
+def find_split_points(pcm, sample_rate=SAMPLE_RATE, chunk_seconds=300, search_seconds=20, frame_ms=30):
+    """
+    Energy-based VAD: returns the sample positions at which to cut pcm into chunks of about
+    chunk_seconds. Each cut is placed in the middle of the longest stretch of silence within
+    search_seconds of the target position (or at the quietest frame when there is no silence), so
+    no cut falls inside speech. Silence is judged within each search window, relative to its
+    quietest frame: a window with only a few short pauses still has them stand out, where a
+    percentile of the whole file would call most of the speech silent.
+    """
+    frame_len = sample_rate * frame_ms // 1000
+    energy = frame_energy(pcm, frame_len)
+    if len(energy) == 0:
+        return []
+
+    frames_per_chunk = chunk_seconds * 1000 // frame_ms
+    search = int(min(search_seconds, chunk_seconds / 4) * 1000 // frame_ms)
+    points = []
+    position = 0
+    # Leave the tail alone when it is too short to be worth a chunk of its own.
+    while len(energy) - position > frames_per_chunk * 1.25:
+        target = position + frames_per_chunk
+        low, high = max(position + 1, target - search), min(len(energy) - 1, target + search)
+        window = energy[low:high]
+        floor = window.min()
+        silent = window < max(floor * 2, floor + 50.0)
+        # A window that is mostly "silent" by that measure has no real pause to find.
+        cut = _longest_run_center(silent) if silent.mean() < 0.5 else None
+        if cut is None:
+            cut = int(np.argmin(window))
+        position = low + cut
+        points.append(position * frame_len)
+    return points
+
+
+def write_chunks(pcm, split_points, chunk_dir, base_name, sample_rate=SAMPLE_RATE):
+    """Writes the chunks between split points as WAVs. Returns a list of (wav_filepath, offset_ms)."""
+    chunks = []
+    bounds = [0] + list(split_points) + [len(pcm)]
+    for index, (start, end) in enumerate(zip(bounds, bounds[1:])):
+        wav_filepath = os.path.join(chunk_dir, f"{base_name}_chunk{index:03d}.wav")
+        with wave.open(wav_filepath, 'wb') as wav:
+            wav.setnchannels(1)
+            wav.setsampwidth(2)
+            wav.setframerate(sample_rate)
+            wav.writeframes(pcm[start:end].tobytes())
+        chunks.append((wav_filepath, start * 1000 // sample_rate))
+    return chunks
+
+
+def transcribe_chunked(audio_filepath, transcribe_chunk, workers=2, chunk_seconds=300, scratch_dir=None,
+                       ffmpeg=None):
+    """
+    Splits an episode at silences and transcribes the chunks in parallel.
+
+    transcribe_chunk(wav_filepath) must return (segments, complete) with timestamps relative to
+    the chunk; they are shifted by the chunk offset and returned in order as one list, together
+    with whether every chunk finished cleanly. The chunk WAVs live in a temporary directory under
+    scratch_dir and are removed afterwards. The episode is decoded under the ffmpeg Supervisor,
+    an unlimited one by default.
+    """
+    pcm = decode_pcm(audio_filepath, ffmpeg or Supervisor())
+    split_points = find_split_points(pcm, chunk_seconds=chunk_seconds)
+    base_name = os.path.splitext(os.path.basename(audio_filepath))[0]
+    chunk_dir = tempfile.mkdtemp(prefix=f"{base_name}_chunks_", dir=scratch_dir)
+    try:
+        chunks = write_chunks(pcm, split_points, chunk_dir, base_name)
+        del pcm
+        print(f"Split {audio_filepath} into {len(chunks)} chunks at silences.")
+
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(lambda chunk: transcribe_chunk(chunk[0]), chunks))
+    finally:
+        shutil.rmtree(chunk_dir, ignore_errors=True)
+
+    segments = []
+    complete = True
+    for (_, offset_ms), (chunk_segments, chunk_complete) in zip(chunks, results):
+        segments += [Segment(s.start_ms + offset_ms, s.end_ms + offset_ms, s.text) for s in chunk_segments]
+        complete = complete and chunk_complete
+    return segments, complete
@@ -3,159 +3,496 @@ import argparse
 import subprocess
 import time
 import sys
-import threading
 import signal
-
-
-
-import psutil
-
-def kill_process_by_name(process_name):
-    """Kill the process by its name."""
-
-    for proc in psutil.process_iter(attrs=['pid', 'name']):
-        if proc.info['name'] == process_name:
-            try:
-                os.kill(proc.info['pid'],  signal.SIGKILL)  # SIGKILL signal
-                print(f"Killed process: {process_name} with pid: {proc.info['pid']}")
-            except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess):
-                pass
-
-def sleep_and_kill_process(process_name, delay=4):
-    """Sleeps for a specified delay and then attempts to kill a process by its name."""
-    time.sleep(delay)
-    kill_process_by_name(process_name)
-
-def format_duration(seconds):
-    """Formats a time duration into a string of the form HH:MM:SS."""
-    hours = int(seconds // 3600)
-    minutes = int((seconds % 3600) // 60)
-    seconds = int(seconds % 60)
-    return f"{hours:02d}:{minutes:02d}:{seconds:02d}"
-
-
-def estimate_time_left(files_sizes, bytes_processed, start_time):
-    current_time = time.time()
-    elapsed_time = current_time - start_time
-    bytes_per_second = bytes_processed / elapsed_time
-
-    remaining_bytes = sum(files_sizes) - bytes_processed
-    estimated_time_left_seconds = remaining_bytes / bytes_per_second if bytes_per_second != 0 else 0
-
-    return format_duration(estimated_time_left_seconds)
+import tempfile
+from contextlib import contextmanager, nullcontext
+
+from chunking import transcribe_chunked
+from jobs import JobStore
+from loop_guard import FALLBACK_DECODING, LoopDetector, parse_segment
+from pipeline import run_pipeline
+from progress import Progress, format_duration, pending_durations
+from subtitles import write_srt
+from supervisor import Supervisor
+from whisper_scheduler import run_scheduled
+
+# Every whisper and ffmpeg child runs in a process group of its own under these supervisors; the
+# command line sets their time and memory limits.
+WHISPER = Supervisor()
+FFMPEG = Supervisor()
+
+
+def ffmpeg_pcm_cmd(mp3_filepath, output):
+    """ffmpeg command decoding to the 16 kHz mono 16-bit WAV whisper expects; output may be "pipe:1"."""
+    return [
+        "ffmpeg",
+        "-nostdin",
+        "-threads", "0",
+        "-i", mp3_filepath,
+        "-f", "wav",
+        "-ac", "1",  # whisper works on mono, a second channel only doubles the bytes
+        "-acodec", "pcm_s16le",
+        "-ar", "16000",
+        output
+    ]
 
 
 def convert_mp3_to_wav(mp3_filepath, wav_filepath):
+    """
+    Converts the MP3 to a 16 kHz WAV for whisper. Returns True when the WAV is ready. ffmpeg writes
+    next to the WAV and the result is renamed into place, so a WAV that exists is always complete.
+    """
+    temp_filepath = f"{wav_filepath}.tmp"
     try:
         # Check if the WAV file already exists and is not empty
         if os.path.exists(wav_filepath) and os.path.getsize(wav_filepath) > 0:
             print(f"WAV file {wav_filepath} already exists and is not empty. Skipping conversion.")
-            return
+            return True
 
         print(f"Converting {mp3_filepath} to {wav_filepath}...")
-        FNULL = open(os.devnull, 'w')
-        cmd = [
-            "ffmpeg",
-            "-nostdin",
-            "-threads", "0",
-            "-i", mp3_filepath,
-            "-f", "wav",
-                "-ac", "2",
-            "-acodec", "pcm_s16le",
-            "-ar", "16000",
-            wav_filepath
-        ]
-        subprocess.run(cmd, stdout=FNULL, stderr=subprocess.STDOUT, check=True)
-    except subprocess.CalledProcessError:
+        if os.path.exists(temp_filepath):
+            os.remove(temp_filepath)  # left over from an interrupted run
+        cmd = ffmpeg_pcm_cmd(mp3_filepath, temp_filepath)
+        FFMPEG.run(cmd)
+        os.replace(temp_filepath, wav_filepath)
+        return True
+    except subprocess.CalledProcessError as e:
         print(f"Error during conversion for {mp3_filepath}. Skipping this file.")
+        print(e.stderr.decode(errors='replace').strip()[-2000:])
     except Exception as e:
         print(f"Unexpected error during conversion for {mp3_filepath}: {e}. Skipping this file.")
-
-
-def generate_subtitles(wav_filepath):
-    output_name = os.path.splitext(wav_filepath)[0]
+    if os.path.exists(temp_filepath):
+        os.remove(temp_filepath)
+    return False
+
+
+DEFAULT_MODEL = 'models/ggml-large.bin'
+
+
+def run_whisper(cmd, temp_output, stdin=None, loop_threshold=5):
+    """
+    Runs one whisper process, echoing its output and copying it to temp_output while watching the
+    printed segments. The process is killed as soon as a repetition loop shows up, and by the
+    WHISPER supervisor when it runs past its limits (raising supervisor.JobTimeout).
+    Returns the LoopDetector holding the segments seen and whether a loop cut the run short.
+    """
+    detector = LoopDetector(loop_threshold)
+    with WHISPER.popen(cmd, stdin=stdin, stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+                       text=True, errors='replace') as process:
+        for line in process.stdout:
+            print(line, end='')
+            temp_output.write(line)
+            segment = parse_segment(line)
+            if segment and detector.feed(segment):
+                print(f"Repetition loop detected at {format_duration(segment.start_ms / 1000)}, stopping whisper.")
+                WHISPER.kill(process)
+                return detector, True
+    if process.returncode != 0:
+        raise subprocess.CalledProcessError(process.returncode, cmd)
+    return detector, False
+
+
+def generate_subtitles(wav_filepath, threads=8, output_name=None, open_input=None, model=DEFAULT_MODEL):
+    """
+    Runs whisper on wav_filepath and writes `output_name`.srt (by default next to the WAV).
+    wav_filepath may be "-" to read the WAV from the stream returned by open_input(), a context
+    manager that is entered once per whisper run.
+
+    The output is watched live. When the same text repeats more than 5 times in a row whisper is
+    killed and restarted from the start of the repetition with the next FALLBACK_DECODING
+    parameters; the segments decoded before the loop are kept and the SRT is stitched together.
+    If every fallback loops too, what was decoded is saved as `output_name`_buggy.srt.
+    whisper writes to `output_name`.partial.srt, which only replaces the SRT once the run is over,
+    so an interrupted run never leaves a truncated SRT behind that looks finished.
+    Returns the final segments and whether the transcription finished without a loop.
+    """
+    output_name = output_name or os.path.splitext(wav_filepath)[0]
     temp_output_file = f"{output_name}_temp_output.txt"
+    partial_name = f"{output_name}.partial"
 
     print(f"Generating subtitles for {wav_filepath}...")
     cmd = [
         './main',
         '-l', 'ja',
-        '-m', 'models/ggml-large.bin',
-        '--threads', '8',
+        '-m', model,
+        '--threads', str(threads),
 	# '--beam-size', '8',
         '--output-srt',
-        '--output-file', f'"{output_name}"',
-        f'"{wav_filepath}"'
+        '--output-file', partial_name,
     ]
-    cmd_string = ' '.join(cmd) + f' 2>&1 | tee "{temp_output_file}"'
-    print(cmd_string)
-    kill_thread = threading.Thread(target=sleep_and_kill_process, args=("ANECompilerService",))
-    kill_thread.start()
-
-    # Run the main subprocess command
-    cmd_string = ' '.join(cmd) + f' 2>&1 | tee "{temp_output_file}"'
-    print(cmd_string)
-    subprocess.run(cmd_string, shell=True, check=True)
-
-    # Now, read the output from the temp_output_file and check for repeated lines
-    with open(temp_output_file, 'r', errors='replace') as f:
-        lines = f.readlines()
-
-    consecutive_duplicate_count = 0
-    last_line_content = ""
-    for line in lines:
-        line_content = line.strip().split(']')[-1].strip()
-        if line_content == last_line_content:
-            consecutive_duplicate_count += 1
+    segments = []
+    offset_ms = 0
+    with open(temp_output_file, 'w', errors='replace') as temp_output:
+        for attempt in range(len(FALLBACK_DECODING) + 1):
+            attempt_cmd = list(cmd)
+            if attempt:
+                attempt_cmd += ['--offset-t', str(offset_ms)] + FALLBACK_DECODING[attempt - 1]
+            attempt_cmd.append(wav_filepath)
+            print(' '.join(attempt_cmd))
+
+            with (open_input() if open_input else nullcontext()) as stdin:
+                detector, looped = run_whisper(attempt_cmd, temp_output, stdin)
+
+            if not looped:
+                segments += detector.segments
+                if attempt:
+                    # whisper only wrote the part after the offset, put the kept prefix back in front.
+                    write_srt(f"{output_name}.srt", segments)
+                else:
+                    os.replace(f"{partial_name}.srt", f"{output_name}.srt")
+                complete = True
+                break
+
+            segments += detector.good_prefix()
+            offset_ms = detector.loop_start_ms()
+            if attempt < len(FALLBACK_DECODING):
+                print(f"Restarting whisper from {format_duration(offset_ms / 1000)} with different decoding parameters.")
         else:
-            consecutive_duplicate_count = 0
-            last_line_content = line_content
-
-        if consecutive_duplicate_count > 5:
-            os.rename(f"{output_name}.srt", f"{output_name}_buggy.srt")
-            break
+            write_srt(f"{output_name}_buggy.srt", segments)
+            complete = False
 
     # Optionally, remove the temporary output file
     os.remove(temp_output_file)
-
-
-
-def process_directory(directory_path, extension=".mp3"):
-    files_sizes = []
-    bytes_processed = 0
-    start_time = time.time()
-
-    for filename in sorted(os.listdir(directory_path)):
-        if filename.endswith(extension):
-            mp3_filepath = os.path.join(directory_path, filename)
-            file_size = os.path.getsize(mp3_filepath)
-            files_sizes.append(file_size)
-
+    if os.path.exists(f"{partial_name}.srt"):
+        os.remove(f"{partial_name}.srt")
+    return segments, complete
+
+
+@contextmanager
+def ffmpeg_pcm_stream(mp3_filepath):
+    """
+    Runs ffmpeg decoding mp3_filepath and yields the pipe its WAV output is written to. The decoder
+    is paced by whisper reading the pipe, so it runs under the WHISPER limits rather than FFMPEG's.
+    """
+    with WHISPER.popen(ffmpeg_pcm_cmd(mp3_filepath, "pipe:1"), stdout=subprocess.PIPE,
+                       stderr=subprocess.DEVNULL) as ffmpeg:
+        yield ffmpeg.stdout
+    # A restarted or killed whisper closes the pipe early, which ffmpeg reports as an error.
+    if ffmpeg.returncode not in (0, -signal.SIGPIPE):
+        print(f"Error during decoding of {mp3_filepath}, the transcription may be incomplete.")
+
+
+def transcribe_streaming(mp3_filepath, threads=8, model=DEFAULT_MODEL):
+    """Pipes ffmpeg's PCM output straight into whisper, so no WAV file is ever written."""
+    output_name = os.path.splitext(mp3_filepath)[0]
+    print(f"Streaming {mp3_filepath} into whisper...")
+    _, complete = generate_subtitles("-", threads, output_name=output_name,
+                                     open_input=lambda: ffmpeg_pcm_stream(mp3_filepath), model=model)
+    return complete
+
+
+def scratch_wav_path(mp3_filepath, scratch_dir):
+    """WAV location inside the scratch directory (ideally a tmpfs such as /dev/shm)."""
+    base = os.path.splitext(os.path.basename(mp3_filepath))[0]
+    return os.path.join(scratch_dir or tempfile.gettempdir(), f"{base}.{os.getpid()}.wav")
+
+
+def transcribe_via_scratch(mp3_filepath, wav_filepath, threads=8, model=DEFAULT_MODEL):
+    """Transcribes a WAV converted into the scratch directory, then deletes it."""
+    try:
+        _, complete = generate_subtitles(wav_filepath, threads, output_name=os.path.splitext(mp3_filepath)[0],
+                                         model=model)
+        return complete
+    finally:
+        if os.path.exists(wav_filepath):
+            os.remove(wav_filepath)
+
+
+def transcribe_in_chunks(mp3_filepath, threads=8, model=DEFAULT_MODEL, chunk_seconds=300, chunk_workers=2,
+                         scratch_dir=None):
+    """
+    Splits the episode at silences into chunks of about chunk_seconds, transcribes chunk_workers
+    chunks at a time (sharing `threads` between them) and stitches the chunk SRTs back together
+    with their timestamps shifted by the chunk offsets. A repetition loop only costs its own chunk.
+    """
+    output_name = os.path.splitext(mp3_filepath)[0]
+    chunk_threads = max(1, threads // chunk_workers)
+    segments, complete = transcribe_chunked(mp3_filepath,
+                                            lambda wav_filepath: generate_subtitles(wav_filepath, chunk_threads,
+                                                                                    model=model),
+                                            workers=chunk_workers,
+                                            chunk_seconds=chunk_seconds,
+                                            scratch_dir=scratch_dir,
+                                            ffmpeg=FFMPEG)
+    write_srt(f"{output_name}.srt" if complete else f"{output_name}_buggy.srt", segments)
+    return complete
+
+
+class StageRecorder:
+    """Forwards the stages a file reaches to the job store and the progress tracker, whichever are in use."""
+
+    def __init__(self, store=None, progress=None):
+        self.store = store
+        self.progress = progress
+
+    def start(self, mp3_filepath):
+        if self.store:
+            self.store.start(mp3_filepath)
+
+    def fail(self, mp3_filepath, error):
+        if self.store:
+            self.store.fail(mp3_filepath, error)
+        if self.progress:
+            self.progress.file_failed(mp3_filepath)
+
+    def stage_done(self, mp3_filepath, stage, seconds):
+        if self.store:
+            self.store.set_stage(mp3_filepath, stage, seconds)
+        if self.progress:
+            self.progress.stage_done(mp3_filepath, stage, seconds)
+
+
+def transcribe_file(mp3_filepath, threads=8, wav_mode="keep", scratch_dir=None, model=DEFAULT_MODEL, chunk_seconds=0,
+                    chunk_workers=2, recorder=None):
+    """
+    Converts and transcribes one file according to wav_mode:
+    keep    - write the WAV next to the MP3 and keep it (the original behaviour)
+    scratch - write the WAV to scratch_dir and delete it after transcription
+    stream  - pipe the decoded PCM into whisper without any WAV file
+    With chunk_seconds > 0 the file is transcribed in parallel chunks instead (see transcribe_in_chunks).
+    The stages the file reaches are reported with their timings to recorder (a StageRecorder).
+    Returns whether the transcription finished without a loop, or None if the conversion failed.
+    """
+    recorder = recorder or StageRecorder()
+    recorder.start(mp3_filepath)
+    started = time.time()
+    try:
+        if chunk_seconds > 0:
+            complete = transcribe_in_chunks(mp3_filepath, threads, model, chunk_seconds, chunk_workers, scratch_dir)
+        elif wav_mode == "stream":
+            complete = transcribe_streaming(mp3_filepath, threads, model)
+        else:
+            if wav_mode == "scratch":
+                wav_filepath = scratch_wav_path(mp3_filepath, scratch_dir)
+            else:
+                wav_filepath = os.path.splitext(mp3_filepath)[0] + ".wav"
+            if not convert_mp3_to_wav(mp3_filepath, wav_filepath):
+                recorder.fail(mp3_filepath, "conversion failed")
+                return None
+            recorder.stage_done(mp3_filepath, "transcoded", time.time() - started)
+            started = time.time()
+            if wav_mode == "scratch":
+                complete = transcribe_via_scratch(mp3_filepath, wav_filepath, threads, model)
+            else:
+                _, complete = generate_subtitles(wav_filepath, threads, model=model)
+    except Exception as e:
+        recorder.fail(mp3_filepath, str(e))
+        raise
+    recorder.stage_done(mp3_filepath, "transcribed" if complete else "buggy", time.time() - started)
+    return complete
+
+
+def pending_files(directory_path, extension=".mp3", store=None):
+    """
+    Returns the paths of the audio files in the directory without an SRT yet.
+    With a JobStore the directory is synced into it and the pending files come from its index instead.
+    """
+    if store:
+        store.sync_directory(directory_path, extension)
+        return store.pending()
+
+    pending = []
     for filename in sorted(os.listdir(directory_path)):
         if filename.endswith(extension):
             mp3_filepath = os.path.join(directory_path, filename)
-            wav_filepath = os.path.splitext(mp3_filepath)[0] + ".wav"
             srt_filepath = os.path.splitext(mp3_filepath)[0] + ".srt"
-
-            # Check if the SRT file already exists and is not empty
             if os.path.exists(srt_filepath) and os.path.getsize(srt_filepath) > 0:
                 print(f"SRT file {srt_filepath} already exists and is not empty. Skipping conversion and recognition.")
                 continue
-
-            convert_mp3_to_wav(mp3_filepath, wav_filepath)
-            generate_subtitles(wav_filepath)
-            # Update bytes processed
-            bytes_processed += os.path.getsize(mp3_filepath)
-
-            # Print the estimated time left
-            time_left = estimate_time_left(files_sizes, bytes_processed, start_time)
-            print(f"Estimated time left: {time_left}")
+            pending.append(mp3_filepath)
+    return pending
+
+
+def start_progress(pending, progress_file=None):
+    """Progress tracker over the audio durations of the pending files, read from their headers."""
+    progress = Progress(pending_durations(pending), progress_file)
+    print(f"{len(pending)} files with {progress.total_seconds / 3600:.2f} h of audio to transcribe.")
+    return progress
+
+
+def process_directory(directory_path, extension=".mp3", threads=8, wav_mode="keep", scratch_dir=None,
+                      model=DEFAULT_MODEL, chunk_seconds=0, chunk_workers=2, store=None, progress_file=None):
+    pending = pending_files(directory_path, extension, store)
+    progress = start_progress(pending, progress_file)
+    recorder = StageRecorder(store, progress)
+
+    for mp3_filepath in pending:
+        try:
+            complete = transcribe_file(mp3_filepath, threads, wav_mode, scratch_dir, model, chunk_seconds,
+                                       chunk_workers, recorder)
+        except Exception as e:
+            # A hung or failed job must not hold up the rest of the queue.
+            print(f"Error while transcribing {mp3_filepath}: {e}. Skipping this file.")
+            continue
+        # Failures were already counted by the recorder
+        if complete is not None:
+            progress.file_done(mp3_filepath)
+
+
+def process_directory_pipelined(directory_path, extension=".mp3", ffmpeg_workers=2, whisper_workers=1,
+                                queue_size=4, threads=8, wav_mode="keep", scratch_dir=None, model=DEFAULT_MODEL,
+                                store=None, progress_file=None):
+    """
+    Same work as process_directory, but ffmpeg conversions run ahead of whisper in their own pool
+    (see pipeline.run_pipeline), so transcoding is hidden behind the recognizer. In scratch mode the
+    queue size plus the ffmpeg and whisper workers also bounds how many WAVs the scratch directory
+    holds at once; in stream mode there
+    is nothing to convert ahead and whisper_workers streaming jobs run side by side.
+    """
+    pending = pending_files(directory_path, extension, store)
+    progress = start_progress(pending, progress_file)
+    recorder = StageRecorder(store, progress)
+    jobs = []
+    for mp3_filepath in pending:
+        if wav_mode == "scratch":
+            jobs.append((mp3_filepath, scratch_wav_path(mp3_filepath, scratch_dir)))
+        else:
+            jobs.append((mp3_filepath, os.path.splitext(mp3_filepath)[0] + ".wav"))
+
+    if wav_mode == "stream":
+        convert = lambda job: True
+        run = lambda job: transcribe_streaming(job[0], threads, model)
+    elif wav_mode == "scratch":
+        convert = lambda job: convert_mp3_to_wav(*job)
+        run = lambda job: transcribe_via_scratch(job[0], job[1], threads, model)
+    else:
+        convert = lambda job: convert_mp3_to_wav(*job)
+        run = lambda job: generate_subtitles(job[1], threads, model=model)[1]
+
+    run_pipeline(jobs,
+                 convert=tracked_convert(recorder, convert, skip=wav_mode == "stream"),
+                 transcribe=tracked_transcribe(recorder, run),
+                 ffmpeg_workers=ffmpeg_workers,
+                 whisper_workers=whisper_workers,
+                 queue_size=queue_size,
+                 on_done=lambda job: progress.file_done(job[0]))
+
+
+def tracked_convert(recorder, convert, skip=False):
+    """Wraps a pipeline convert step so that it reports the "transcoded" stage of its job to recorder."""
+    def wrapped(job):
+        recorder.start(job[0])
+        if skip:
+            return True
+        started = time.time()
+        converted = convert(job)
+        if converted:
+            recorder.stage_done(job[0], "transcoded", time.time() - started)
+        else:
+            recorder.fail(job[0], "conversion failed")
+        return converted
+    return wrapped
+
+
+def tracked_transcribe(recorder, transcribe):
+    """Wraps a pipeline transcribe step so that it reports the "transcribed" or "buggy" stage of its job."""
+    def wrapped(job):
+        started = time.time()
+        try:
+            complete = transcribe(job)
+        except Exception as e:
+            recorder.fail(job[0], str(e))
+            raise
+        recorder.stage_done(job[0], "transcribed" if complete else "buggy", time.time() - started)
+    return wrapped
+
+
+def process_directory_scheduled(directory_path, extension=".mp3", instances=2, cores=None, wav_mode="keep",
+                                scratch_dir=None, model=DEFAULT_MODEL, chunk_seconds=0, chunk_workers=2, store=None,
+                                progress_file=None):
+    """
+    Runs several whisper instances side by side (see whisper_scheduler.run_scheduled): the cores
+    are split between the instances, files are assigned longest-first and the realtime factor of
+    every file is reported.
+    """
+    pending = pending_files(directory_path, extension, store)
+    progress = start_progress(pending, progress_file)
+    recorder = StageRecorder(store, progress)
+
+    def transcribe(mp3_filepath, threads):
+        # run_scheduled only skips on_done for jobs that raise
+        if transcribe_file(mp3_filepath, threads, wav_mode, scratch_dir, model, chunk_seconds, chunk_workers,
+                           recorder) is None:
+            raise RuntimeError("conversion failed")
+
+    run_scheduled(pending,
+                  transcribe=transcribe,
+                  instances=instances,
+                  cores=cores,
+                  durations=progress.durations,
+                  on_done=lambda mp3_filepath, duration, elapsed: progress.file_done(mp3_filepath))
 
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Convert MP3 files to WAV and generate SRT subtitles.")
     parser.add_argument("dir", type=str, help="Directory containing MP3 files.")
-    parser.add_argument("ext", type=str, help="Extension, by default .mp3 . Normally starts with a dot.")
+    parser.add_argument("ext", type=str, nargs="?", default=".mp3",
+                        help="Extension, by default .mp3 . Normally starts with a dot.")
+    parser.add_argument("--pipeline", action="store_true",
+                        help="Convert with a pool of ffmpeg workers ahead of whisper instead of one file at a time.")
+    parser.add_argument("--ffmpeg_workers", type=int, default=2, help="Parallel ffmpeg conversions in --pipeline mode.")
+    parser.add_argument("--whisper_workers", type=int, default=1, help="Parallel whisper runs in --pipeline mode.")
+    parser.add_argument("--queue_size", type=int, default=4,
+                        help="Converted files queued for whisper in --pipeline mode. Each ffmpeg worker can hold "
+                             "one more finished file while the queue is full.")
+    parser.add_argument("--threads", type=int, default=8, help="Threads per whisper run.")
+    parser.add_argument("--wav_mode", choices=["keep", "scratch", "stream"], default="keep",
+                        help="keep: WAV next to the MP3; scratch: WAV in --scratch_dir, deleted after transcription; "
+                             "stream: pipe decoded PCM into whisper without a WAV file.")
+    parser.add_argument("--scratch_dir", type=str, default=None,
+                        help="Directory for temporary WAVs in scratch and chunked mode, ideally a tmpfs such as "
+                             "/dev/shm (default: the system temp directory).")
+    parser.add_argument("--model", type=str, default=DEFAULT_MODEL, help="Path of the whisper model.")
+    parser.add_argument("--instances", type=int, default=0,
+                        help="Run this many whisper instances at once, splitting the cores between them and "
+                             "assigning files longest-first. 0 keeps a single instance.")
+    parser.add_argument("--cores", type=int, default=None,
+                        help="Cores to split between --instances (default: all cores available to the process).")
+    parser.add_argument("--chunk_minutes", type=float, default=0,
+                        help="Split episodes at silences into chunks of about this length and transcribe the chunks "
+                             "in parallel. 0 transcribes every episode in one piece. Not used with --pipeline.")
+    parser.add_argument("--chunk_workers", type=int, default=2,
+                        help="Chunks of one episode transcribed at once, sharing the threads of the episode.")
+    parser.add_argument("--jobs_db", type=str, default=None,
+                        help="SQLite job store tracking the stage of every episode (downloaded, transcoded, "
+                             "transcribed, buggy, exported). Pending work is read from it instead of scanning for "
+                             "SRTs, and an interrupted run resumes from the last committed stage of each episode.")
+    parser.add_argument("--progress_file", type=str, default=None,
+                        help="Keep a progress snapshot (audio hours done, ETA, audio seconds per second per stage) in "
+                             "this file, as a Prometheus textfile if it ends in .prom and as JSON otherwise.")
+    parser.add_argument("--whisper_timeout_minutes", type=float, default=0,
+                        help="Kill a whisper run that takes longer than this (wall clock) and move on. 0 means no limit.")
+    parser.add_argument("--whisper_cpu_minutes", type=float, default=0,
+                        help="CPU time a whisper run may use, summed over its threads. 0 means no limit.")
+    parser.add_argument("--whisper_memory_mb", type=int, default=0,
+                        help="Address space a whisper run may allocate, in MB. 0 means no limit.")
+    parser.add_argument("--ffmpeg_timeout_minutes", type=float, default=10,
+                        help="Kill an ffmpeg conversion that takes longer than this. 0 means no limit.")
     args = parser.parse_args()
+    chunk_seconds = int(args.chunk_minutes * 60)
+    WHISPER.wall_seconds = int(args.whisper_timeout_minutes * 60)
+    WHISPER.cpu_seconds = int(args.whisper_cpu_minutes * 60)
+    WHISPER.memory_bytes = args.whisper_memory_mb * 1024 * 1024
+    FFMPEG.wall_seconds = int(args.ffmpeg_timeout_minutes * 60)
+    # The children run in their own process groups and no longer see a Ctrl-C or SIGTERM sent to
+    # this script, so take them down on the way out.
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(128 + signum))
+    store = JobStore(args.jobs_db) if args.jobs_db else None
 
-    process_directory(args.dir, args.ext)
+    try:
+        if args.instances > 0:
+            process_directory_scheduled(args.dir, args.ext, args.instances, args.cores, args.wav_mode, args.scratch_dir,
+                                        args.model, chunk_seconds, args.chunk_workers, store,
+                                        args.progress_file)
+        elif args.pipeline:
+            process_directory_pipelined(args.dir, args.ext, args.ffmpeg_workers, args.whisper_workers, args.queue_size,
+                                        args.threads, args.wav_mode, args.scratch_dir, args.model, store,
+                                        args.progress_file)
+        else:
+            process_directory(args.dir, args.ext, args.threads, args.wav_mode, args.scratch_dir, args.model, chunk_seconds,
+                              args.chunk_workers, store, args.progress_file)
+    except (KeyboardInterrupt, SystemExit):
+        WHISPER.kill_all()
+        FFMPEG.kill_all()
+        # Worker threads of the pipelined and scheduled modes would go on with the next files.
+        os._exit(1)
@@ -1,27 +1,66 @@
 import argparse
-import re
+import os
+import shutil
+from concurrent.futures import ProcessPoolExecutor
+
+from subtitles import iter_srt, srt_files
 
 def remove_timestamps(input_file, output_file):
-    with open(input_file, 'r', encoding='utf-8') as f:
-        lines = f.readlines()
+    # Cue by cue, the SRT is never read into memory as a whole
+    with open(output_file, 'w', encoding='utf-8') as f:
+        f.writelines(f"{cue.text}\n\n" for cue in iter_srt(input_file))
 
-    cleaned_content = []
-    for line in lines:
-        # Skip subtitle sequence numbers and timestamps
-        if re.match(r'^\d+$', line.strip()) or re.match(r'^\d{2}:\d{2}:\d{2},\d{3} --> \d{2}:\d{2}:\d{2},\d{3}$', line.strip()):
-            continue
-        cleaned_content.append(line)
+def remove_timestamps_task(args):
+    input_file, output_file = args
+    os.makedirs(os.path.dirname(output_file), exist_ok=True)
+    remove_timestamps(input_file, output_file)
+    return output_file
 
-    with open(output_file, 'w', encoding='utf-8') as f:
-        f.write(''.join(cleaned_content))
+def convert_batch(srt_paths, output_dir, num_processes=None, corpus_file=None):
+    """
+    Cleans every SRT in parallel into output_dir, keeping the folders below the directory the SRTs
+    have in common (episodes of different shows often share a name), and with corpus_file also
+    concatenates the texts into one corpus, in the order of srt_paths.
+    """
+    srt_paths = list(dict.fromkeys(os.path.abspath(srt_path) for srt_path in srt_paths))
+    if not srt_paths:
+        return 0
+    base_dir = os.path.commonpath([os.path.dirname(srt_path) for srt_path in srt_paths])
+    tasks = [(srt_path, os.path.join(output_dir, os.path.splitext(os.path.relpath(srt_path, base_dir))[0] + '.txt'))
+             for srt_path in srt_paths]
+    corpus = open(corpus_file, 'wb') if corpus_file else None
+    try:
+        with ProcessPoolExecutor(max_workers=num_processes) as executor:
+            # Every task has its own output file, so each one is read back only by its own result
+            for txt_path in executor.map(remove_timestamps_task, tasks, chunksize=16):
+                if corpus:
+                    with open(txt_path, 'rb') as f:
+                        shutil.copyfileobj(f, corpus)
+    finally:
+        if corpus:
+            corpus.close()
+    return len(tasks)
 
 def main():
     parser = argparse.ArgumentParser(description="Remove timestamps and sequence numbers from an SRT file.")
-    parser.add_argument("input_file", help="Path to the input SRT file.")
-    parser.add_argument("output_file", help="Path to save the cleaned SRT file.")
+    parser.add_argument("input_file", help="Path to the input SRT file, or a directory or glob pattern of SRT files.")
+    parser.add_argument("output_file", help="Path to save the cleaned SRT file, or the output directory.")
+    parser.add_argument("--processes", type=int, default=None,
+                        help="Directory or glob input: number of files cleaned in parallel (default: one per CPU).")
+    parser.add_argument("--corpus", type=str, default=None,
+                        help="Directory or glob input: also write all texts, in name order, into this one file.")
 
     args = parser.parse_args()
 
+    if not os.path.isfile(args.input_file):
+        # A glob matching nothing comes back as itself
+        srt_paths = [srt_path for srt_path in srt_files([args.input_file]) if os.path.isfile(srt_path)]
+        if not srt_paths:
+            parser.error(f"no SRT files found in {args.input_file}")
+        count = convert_batch(srt_paths, args.output_file, args.processes, args.corpus)
+        print(f"Timestamps and sequence numbers removed from {count} files. Cleaned content saved to {args.output_file}")
+        return
+
     remove_timestamps(args.input_file, args.output_file)
     print(f"Timestamps and sequence numbers removed. Cleaned content saved to {args.output_file}")
 
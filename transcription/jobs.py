@@ -0,0 +1,170 @@
+import argparse
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+
+# Stages an episode goes through, in order. "buggy" replaces "transcribed" when whisper looped.
+STAGES = ("downloaded", "transcoded", "transcribed", "buggy", "exported")
+# Stages that still need the recognizer.
+PENDING_STAGES = ("downloaded", "transcoded")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    path TEXT PRIMARY KEY,
+    stage TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    mtime REAL NOT NULL,
+    content_hash TEXT NOT NULL,
+    duration REAL,
+    started_at REAL,
+    updated_at REAL,
+    transcode_seconds REAL,
+    transcribe_seconds REAL,
+    error TEXT
+);
+CREATE INDEX IF NOT EXISTS jobs_stage ON jobs (stage, path);
+"""
+
+
+def content_hash(path, sample_size=1 << 20):
+    """
+    Fingerprint of an audio file: SHA-1 over its size and its first and last MiB. Cheap enough to
+    run on a whole archive and still changes whenever a file is re-downloaded or replaced.
+    """
+    digest = hashlib.sha1()
+    size = os.path.getsize(path)
+    digest.update(str(size).encode())
+    with open(path, 'rb') as f:
+        digest.update(f.read(sample_size))
+        if size > sample_size:
+            f.seek(max(sample_size, size - sample_size))
+            digest.update(f.read(sample_size))
+    return digest.hexdigest()
+
+
+def stage_on_disk(audio_filepath):
+    """The stage an episode has reached judging by the SRT (or _buggy.srt) next to it."""
+    base = os.path.splitext(audio_filepath)[0]
+    if os.path.exists(base + "_buggy.srt"):
+        return "buggy"
+    if os.path.exists(base + ".srt") and os.path.getsize(base + ".srt") > 0:
+        return "transcribed"
+    return "downloaded"
+
+
+class JobStore:
+    """
+    SQLite table of transcription jobs, one row per episode, tracking its stage, content hash and
+    timings. A stage is only committed once its output is complete, so after a crash every episode
+    resumes from its last committed stage and a half-written SRT is never taken for a finished one.
+    Safe to share between threads.
+    """
+
+    def __init__(self, db_path):
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        self.lock = threading.Lock()
+        with self.lock, self.conn:
+            self.conn.executescript(SCHEMA)
+
+    def sync_directory(self, directory_path, extension=".mp3"):
+        """
+        Registers new audio files and resets changed ones with a single directory scan.
+
+        Files seen for the first time start as "downloaded", unless a finished SRT (or _buggy.srt)
+        from an earlier run without the job store already sits next to them. Files whose size or
+        mtime changed are re-hashed and start over when their content changed.
+        """
+        with self.lock:
+            known = {row[0]: row[1:] for row in self.conn.execute("SELECT path, size, mtime, content_hash FROM jobs")}
+
+        now = time.time()
+        inserts = []
+        resets = []
+        touched = []
+        for entry in sorted(os.scandir(directory_path), key=lambda e: e.name):
+            if not entry.name.endswith(extension) or not entry.is_file():
+                continue
+            stat = entry.stat()
+            previous = known.get(entry.path)
+            if previous and previous[0] == stat.st_size and previous[1] == stat.st_mtime:
+                continue
+
+            digest = content_hash(entry.path)
+            if previous is None:
+                inserts.append((entry.path, stage_on_disk(entry.path), stat.st_size, stat.st_mtime, digest, now))
+            elif previous[2] != digest:
+                resets.append((stat.st_size, stat.st_mtime, digest, now, entry.path))
+            else:
+                touched.append((stat.st_size, stat.st_mtime, entry.path))
+
+        with self.lock, self.conn:
+            self.conn.executemany(
+                "INSERT INTO jobs (path, stage, size, mtime, content_hash, updated_at) VALUES (?, ?, ?, ?, ?, ?)",
+                inserts)
+            self.conn.executemany(
+                "UPDATE jobs SET stage = 'downloaded', size = ?, mtime = ?, content_hash = ?, updated_at = ?, "
+                "error = NULL WHERE path = ?",
+                resets)
+            self.conn.executemany("UPDATE jobs SET size = ?, mtime = ? WHERE path = ?", touched)
+        if inserts or resets:
+            print(f"Job store: {len(inserts)} new episodes, {len(resets)} changed episodes.")
+
+    def pending(self):
+        """Paths of the episodes still waiting for the recognizer, in name order. Deleted files are left out."""
+        placeholders = ",".join("?" * len(PENDING_STAGES))
+        with self.lock:
+            rows = self.conn.execute(f"SELECT path FROM jobs WHERE stage IN ({placeholders}) ORDER BY path",
+                                     PENDING_STAGES).fetchall()
+        return [row[0] for row in rows if os.path.exists(row[0])]
+
+    def start(self, path):
+        with self.lock, self.conn:
+            self.conn.execute("UPDATE jobs SET started_at = ?, error = NULL WHERE path = ?", (time.time(), path))
+
+    def set_stage(self, path, stage, seconds=None):
+        """Commits that path reached stage, recording how long the stage took."""
+        if stage not in STAGES:
+            raise ValueError(f"Unknown stage {stage}, expected one of {', '.join(STAGES)}")
+        column = {"transcoded": "transcode_seconds", "transcribed": "transcribe_seconds",
+                  "buggy": "transcribe_seconds"}.get(stage)
+        with self.lock, self.conn:
+            if column:
+                self.conn.execute(f"UPDATE jobs SET stage = ?, updated_at = ?, {column} = ? WHERE path = ?",
+                                  (stage, time.time(), seconds, path))
+            else:
+                self.conn.execute("UPDATE jobs SET stage = ?, updated_at = ? WHERE path = ?",
+                                  (stage, time.time(), path))
+
+    def fail(self, path, error):
+        with self.lock, self.conn:
+            self.conn.execute("UPDATE jobs SET error = ?, updated_at = ? WHERE path = ?", (error, time.time(), path))
+
+    def stages(self):
+        with self.lock:
+            return dict(self.conn.execute("SELECT path, stage FROM jobs").fetchall())
+
+    def counts(self):
+        with self.lock:
+            return dict(self.conn.execute("SELECT stage, COUNT(*) FROM jobs GROUP BY stage").fetchall())
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Inspect or update the transcription job store.")
+    parser.add_argument("db", type=str, help="Path of the job store SQLite file.")
+    parser.add_argument("--mark", type=str, choices=STAGES, default=None,
+                        help="Set the stage of the given files, e.g. 'exported' after building a deck.")
+    parser.add_argument("files", nargs="*", help="Audio files to update with --mark.")
+    args = parser.parse_intermixed_args()
+
+    store = JobStore(args.db)
+    if args.mark:
+        for path in args.files:
+            store.set_stage(path, args.mark)
+    for stage in STAGES:
+        print(f"{stage}: {store.counts().get(stage, 0)}")
@@ -0,0 +1,53 @@
+import re
+from collections import namedtuple
+
+# whisper.cpp prints every decoded segment as "[00:01:02.340 --> 00:01:05.120]  text".
+SEGMENT_LINE = re.compile(r'^\[(\d+):(\d\d):(\d\d)\.(\d{3}) --> (\d+):(\d\d):(\d\d)\.(\d{3})\]\s*(.*)$')
+
+Segment = namedtuple("Segment", ["start_ms", "end_ms", "text"])
+
+# Decoding parameters tried, in order, when a run falls into a repetition loop. Dropping the text
+# context stops whisper from conditioning on its own repeated output, beam search and a lower
+# entropy threshold make it reject low-information (repetitive) decodes sooner.
+FALLBACK_DECODING = [
+    ['--max-context', '0'],
+    ['--max-context', '0', '--beam-size', '5', '--entropy-thold', '2.8'],
+]
+
+
+def parse_segment(line):
+    """Returns the Segment printed on a whisper output line, or None for any other line."""
+    match = SEGMENT_LINE.match(line.strip())
+    if not match:
+        return None
+    h1, m1, s1, ms1, h2, m2, s2, ms2, text = match.groups()
+    start_ms = ((int(h1) * 60 + int(m1)) * 60 + int(s1)) * 1000 + int(ms1)
+    end_ms = ((int(h2) * 60 + int(m2)) * 60 + int(s2)) * 1000 + int(ms2)
+    return Segment(start_ms, end_ms, text.strip())
+
+
+class LoopDetector:
+    """
+    Watches segments as whisper prints them and reports a hallucination loop as soon as the same
+    text has been repeated more than `threshold` times in a row.
+    """
+
+    def __init__(self, threshold=5):
+        self.threshold = threshold
+        self.segments = []
+        self.run_start = 0
+
+    def feed(self, segment):
+        """Records a segment and returns True once it completes a loop."""
+        if self.segments and segment.text != self.segments[-1].text:
+            self.run_start = len(self.segments)
+        self.segments.append(segment)
+        return len(self.segments) - 1 - self.run_start > self.threshold
+
+    def good_prefix(self):
+        """The segments decoded before the repeated text started."""
+        return self.segments[:self.run_start]
+
+    def loop_start_ms(self):
+        return self.segments[self.run_start].start_ms
+
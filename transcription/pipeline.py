@@ -0,0 +1,52 @@
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+
+def run_pipeline(jobs, convert, transcribe, ffmpeg_workers=2, whisper_workers=1, queue_size=4, on_done=None):
+    """
+    Runs conversion and transcription as two decoupled stages.
+
+    A pool of `ffmpeg_workers` threads calls convert(job) ahead of time and hands every converted
+    job to a bounded queue; `whisper_workers` threads take jobs off the queue and call
+    transcribe(job). Once the queue holds `queue_size` jobs the converters wait. Each converter
+    can hold a finished file while it waits, so at most `queue_size + ffmpeg_workers` converted
+    files sit on disk waiting for the recognizer, besides the `whisper_workers` files being
+    transcribed. convert must return a falsy value when the job failed; such jobs never reach
+    transcribe. on_done(job) is called after every transcription, from the whisper thread that ran it.
+    """
+    ready = queue.Queue(maxsize=queue_size)
+
+    def convert_stage(job):
+        try:
+            converted = convert(job)
+        except Exception as e:
+            print(f"Unexpected error while converting {job}: {e}")
+            return
+        if converted:
+            ready.put(job)
+
+    def transcribe_stage():
+        while True:
+            job = ready.get()
+            if job is None:
+                return
+            try:
+                transcribe(job)
+            except Exception as e:
+                print(f"Error while transcribing {job}: {e}. Skipping this file.")
+                continue
+            if on_done:
+                on_done(job)
+
+    consumers = [threading.Thread(target=transcribe_stage, daemon=True) for _ in range(whisper_workers)]
+    for consumer in consumers:
+        consumer.start()
+
+    with ThreadPoolExecutor(max_workers=ffmpeg_workers) as converters:
+        list(converters.map(convert_stage, jobs))
+
+    for _ in consumers:
+        ready.put(None)
+    for consumer in consumers:
+        consumer.join()
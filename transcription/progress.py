@@ -0,0 +1,152 @@
+import json
+import os
+import threading
+import time
+
+from audio_duration import scan_durations
+
+# Job stages mapped to the pipeline stage whose throughput they measure.
+STAGE_NAMES = {"transcoded": "transcode", "transcribed": "transcribe", "buggy": "transcribe"}
+
+
+def format_duration(seconds):
+    """Formats a time duration into a string of the form HH:MM:SS."""
+    hours = int(seconds // 3600)
+    minutes = int((seconds % 3600) // 60)
+    seconds = int(seconds % 60)
+    return f"{hours:02d}:{minutes:02d}:{seconds:02d}"
+
+
+def pending_durations(filepaths):
+    """
+    Audio duration of every file, read from the headers (see audio_duration). Files whose header
+    cannot be read are estimated from their size at the mean byte rate of the others.
+    """
+    durations = scan_durations(filepaths)
+    known = [path for path, duration in durations.items() if duration]
+    if known:
+        seconds_per_byte = sum(durations[p] for p in known) / sum(os.path.getsize(p) for p in known)
+        for path, duration in durations.items():
+            if not duration:
+                durations[path] = os.path.getsize(path) * seconds_per_byte
+    return durations
+
+
+class Progress:
+    """
+    Tracks a transcription run in seconds of audio rather than bytes. Only the files this run has
+    to process count towards the total, so skipped files no longer skew the estimate. For every
+    stage it keeps the audio seconds handled per wall-clock second, and after each update it
+    optionally writes a snapshot to `output_file`: a Prometheus textfile when the name ends in
+    .prom (for the node_exporter textfile collector), JSON otherwise. Safe to share between threads.
+    """
+
+    def __init__(self, durations, output_file=None):
+        self.durations = durations
+        self.total_seconds = sum(d or 0 for d in durations.values())
+        self.output_file = output_file
+        self.done_seconds = 0.0
+        self.files_done = 0
+        self.failed_seconds = 0.0
+        self.files_failed = 0
+        self.stages = {}
+        self.start_time = time.time()
+        self.lock = threading.Lock()
+        self.write()
+
+    def stage_done(self, filepath, stage, wall_seconds):
+        """Records that `stage` of filepath took wall_seconds."""
+        stage = STAGE_NAMES.get(stage, stage)
+        with self.lock:
+            totals = self.stages.setdefault(stage, {"audio_seconds": 0.0, "wall_seconds": 0.0, "files": 0})
+            totals["audio_seconds"] += self.durations.get(filepath) or 0
+            totals["wall_seconds"] += wall_seconds
+            totals["files"] += 1
+
+    def file_done(self, filepath):
+        """Records that filepath went through every stage and reports the estimated time left."""
+        with self.lock:
+            self.done_seconds += self.durations.get(filepath) or 0
+            self.files_done += 1
+        self.write()
+        print(f"Estimated time left: {format_duration(self.eta())} "
+              f"({self.done_seconds / 3600:.2f} of {self.total_seconds / 3600:.2f} h of audio, "
+              f"{self.rate():.2f} audio seconds per second)")
+
+    def file_failed(self, filepath):
+        """Records that filepath was given up on: it no longer counts as work left, nor as work done."""
+        with self.lock:
+            self.failed_seconds += self.durations.get(filepath) or 0
+            self.files_failed += 1
+        self.write()
+
+    def rate(self):
+        """Audio seconds finished per wall-clock second since the run started."""
+        elapsed = time.time() - self.start_time
+        return self.done_seconds / elapsed if elapsed > 0 else 0.0
+
+    def eta(self):
+        rate = self.rate()
+        return (self.total_seconds - self.done_seconds - self.failed_seconds) / rate if rate else 0.0
+
+    def snapshot(self):
+        with self.lock:
+            stages = {name: dict(totals, realtime_ratio=totals["audio_seconds"] / totals["wall_seconds"]
+                                 if totals["wall_seconds"] else 0.0)
+                      for name, totals in self.stages.items()}
+            return {
+                "audio_seconds_total": self.total_seconds,
+                "audio_seconds_done": self.done_seconds,
+                "files_total": len(self.durations),
+                "files_done": self.files_done,
+                "audio_seconds_failed": self.failed_seconds,
+                "files_failed": self.files_failed,
+                "elapsed_seconds": time.time() - self.start_time,
+                "audio_seconds_per_second": self.rate(),
+                "eta_seconds": self.eta(),
+                "stages": stages,
+            }
+
+    def write(self):
+        """Writes the snapshot to output_file, replacing the previous one atomically so scrapers never see half a file."""
+        if not self.output_file:
+            return
+        snapshot = self.snapshot()
+        if self.output_file.endswith(".prom"):
+            content = prometheus_text(snapshot)
+        else:
+            content = json.dumps(snapshot, indent=2)
+        temp_file = f"{self.output_file}.{os.getpid()}.tmp"
+        with self.lock:
+            with open(temp_file, 'w') as f:
+                f.write(content)
+            os.replace(temp_file, self.output_file)
+
+
+def prometheus_text(snapshot):
+    """Renders a Progress snapshot in the Prometheus text exposition format."""
+    lines = []
+
+    def gauge(name, help_text, samples):
+        lines.append(f"# HELP transcription_{name} {help_text}")
+        lines.append(f"# TYPE transcription_{name} gauge")
+        for labels, value in samples:
+            lines.append(f"transcription_{name}{labels} {value}")
+
+    for key, help_text in [("audio_seconds_total", "Seconds of audio this run has to transcribe."),
+                           ("audio_seconds_done", "Seconds of audio transcribed so far."),
+                           ("files_total", "Files this run has to transcribe."),
+                           ("files_done", "Files transcribed so far."),
+                           ("audio_seconds_failed", "Seconds of audio in files that failed."),
+                           ("files_failed", "Files that failed to convert or transcribe."),
+                           ("audio_seconds_per_second", "Audio seconds transcribed per wall-clock second."),
+                           ("eta_seconds", "Estimated seconds until the run is finished.")]:
+        gauge(key, help_text, [("", snapshot[key])])
+    stages = sorted(snapshot["stages"].items())
+    for key, help_text in [("stage_audio_seconds", "Seconds of audio that went through the stage."),
+                           ("stage_wall_seconds", "Wall-clock seconds spent in the stage."),
+                           ("stage_realtime_ratio", "Audio seconds handled per wall-clock second by the stage.")]:
+        field = {"stage_audio_seconds": "audio_seconds", "stage_wall_seconds": "wall_seconds",
+                 "stage_realtime_ratio": "realtime_ratio"}[key]
+        gauge(key, help_text, [(f'{{stage="{name}"}}', totals[field]) for name, totals in stages])
+    return "\n".join(lines) + "\n"
@@ -1,27 +1,27 @@
 import argparse
+import hashlib
+import json
 import os
+from concurrent.futures import ProcessPoolExecutor
 
-def read_srt(file_path):
-    with open(file_path, 'r', encoding='utf-8') as file:
-        return file.read().strip().split('\n\n')
+from subtitles import read_srt
 
-def extract_timestamp_and_text(srt_block):
-    lines = srt_block.split('\n')
-    start_timestamp, end_timestamp = lines[1].split(' --> ')
+# Kept in the output directory: what every page was rendered from, so a rebuild only renders the
+# SRTs that changed. The cues of the other episodes are taken from the previous search index.
+MANIFEST_NAME = '.srt2html_manifest.json'
+INDEX_NAME = 'search_index.json'
 
-    # Extracting only the mm:ss from the timestamps
-    visible_start = ":".join(start_timestamp.split(":")[1:3]).split(',')[0]
+def visible_timestamp(cue):
+    # Only the mm:ss of the start
+    return f"{cue.start_ms // 60000 % 60:02d}:{cue.start_ms // 1000 % 60:02d}"
 
-    text = ' '.join(lines[2:])
-    return visible_start, start_timestamp, end_timestamp, text
-
-def generate_html_content(srt_blocks):
+def generate_html_content(cues):
     html_blocks = []
 
-    for idx, block in enumerate(srt_blocks, 1):
-        visible_timestamp, start_timestamp, end_timestamp, text = extract_timestamp_and_text(block)
+    for idx, cue in enumerate(cues, 1):
+        text = cue.text.replace('\n', ' ')
         html_blocks.append(
-            f'<div>\n\t<a id="sub-{idx}" href="#sub-{idx}"><span class="timestamp" data-subbegin="{start_timestamp}" data-subend="{end_timestamp}">{visible_timestamp}</span></a>\n\t<p class="subtitle-text">{text}</p>\n</div>\n')
+            f'<div>\n\t<a id="sub-{idx}" href="#sub-{idx}"><span class="timestamp" data-subbegin="{cue.start}" data-subend="{cue.end}">{visible_timestamp(cue)}</span></a>\n\t<p class="subtitle-text">{text}</p>\n</div>\n')
 
     return '\n'.join(html_blocks)
 
@@ -69,23 +69,120 @@ def wrap_html(html_content, filename):
 '''
     return template.format(content=html_content, filename=filename)
 
+def render_file(srt_path, html_path):
+    """Writes the page of one SRT and returns its cues for the search index as [start_ms, end_ms, text]."""
+    cues = read_srt(srt_path)
+
+    # Extract filename without extension
+    filename_without_ext = os.path.basename(srt_path).split('.')[0]
+
+    with open(html_path, 'w', encoding='utf-8') as out_file:
+        out_file.write(wrap_html(generate_html_content(cues), filename_without_ext))
+
+    return [[cue.start_ms, cue.end_ms, cue.text.replace('\n', ' ')] for cue in cues]
+
+def render_task(args):
+    return render_file(*args)
+
+def file_hash(file_path):
+    with open(file_path, 'rb') as f:
+        return hashlib.sha1(f.read()).hexdigest()
+
+def load_json(file_path, default):
+    try:
+        with open(file_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return default
+
+def write_json(file_path, data):
+    # Written next to the destination and renamed into place, a reader never sees half a file
+    temp_path = f"{file_path}.tmp"
+    with open(temp_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False, separators=(',', ':'))
+    os.replace(temp_path, file_path)
+
+def build_directory(input_dir, output_dir, num_processes=None, index_path=None, force=False):
+    """
+    Renders every SRT of input_dir whose size and mtime, or failing those its hash, changed since
+    the last build, and writes the search index of the whole directory: one entry per episode with
+    its page and cues. Returns the number of pages rendered.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    manifest_path = os.path.join(output_dir, MANIFEST_NAME)
+    index_path = index_path or os.path.join(output_dir, INDEX_NAME)
+    previous_manifest = load_json(manifest_path, {})
+    manifest = {} if force else previous_manifest
+
+    entries = {}
+    to_render = []
+    for entry in sorted(os.scandir(input_dir), key=lambda entry: entry.name):
+        if not entry.name.endswith('.srt') or not entry.is_file():
+            continue
+        stat = entry.stat()
+        page = os.path.splitext(entry.name)[0] + '.html'
+        known = manifest.get(entry.name)
+        if known and os.path.exists(os.path.join(output_dir, page)):
+            if known['size'] == stat.st_size and known['mtime_ns'] == stat.st_mtime_ns:
+                entries[entry.name] = known
+                continue
+            # Touched but maybe not changed (copied, synced): only the content decides.
+            sha1 = file_hash(entry.path)
+            if known['sha1'] == sha1:
+                entries[entry.name] = dict(known, size=stat.st_size, mtime_ns=stat.st_mtime_ns)
+                continue
+        else:
+            sha1 = file_hash(entry.path)
+        entries[entry.name] = {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns, 'sha1': sha1, 'page': page}
+        to_render.append(entry.name)
+
+    if not to_render and entries == manifest and os.path.exists(index_path):
+        return 0
+
+    # Episodes that were not rendered keep the cues of the previous index, unless it lost them.
+    cues = {} if force else {episode['page']: episode['cues']
+                             for episode in load_json(index_path, {}).get('episodes', [])}
+    to_render += [name for name, entry in entries.items() if name not in to_render and entry['page'] not in cues]
+
+    with ProcessPoolExecutor(max_workers=num_processes) as executor:
+        tasks = [(os.path.join(input_dir, name), os.path.join(output_dir, entries[name]['page'])) for name in to_render]
+        for name, page_cues in zip(to_render, executor.map(render_task, tasks)):
+            cues[entries[name]['page']] = page_cues
+
+    write_json(index_path, {
+        'episodes': [{'name': os.path.splitext(name)[0], 'page': entry['page'], 'cues': cues[entry['page']]}
+                     for name, entry in entries.items()],
+    })
+    # Pages of SRTs that were deleted since the last build
+    pages = {entry['page'] for entry in entries.values()}
+    for entry in previous_manifest.values():
+        if entry['page'] not in pages:
+            try:
+                os.remove(os.path.join(output_dir, entry['page']))
+            except FileNotFoundError:
+                pass
+    # The manifest goes last: if the build is interrupted, the next one renders these pages again.
+    write_json(manifest_path, entries)
+    return len(to_render)
+
 def main():
     parser = argparse.ArgumentParser(description="Convert .srt file to an HTML format with custom styling.")
-    parser.add_argument('input', type=str, help="Path to the .srt file")
-    parser.add_argument('output', type=str, help="Path to save the generated HTML file")
+    parser.add_argument('input', type=str, help="Path to the .srt file, or a directory of .srt files to render them all")
+    parser.add_argument('output', type=str, help="Path to save the generated HTML file, or the output directory")
+    parser.add_argument('--processes', type=int, default=None,
+                        help="Directory mode: number of pages rendered in parallel (default: one per CPU)")
+    parser.add_argument('--index', type=str, default=None,
+                        help=f"Directory mode: path of the JSON search index (default: {INDEX_NAME} in the output directory)")
+    parser.add_argument('--force', action='store_true', help="Directory mode: render every page, changed or not")
 
     args = parser.parse_args()
 
-    srt_content = read_srt(args.input)
-    html_blocks = generate_html_content(srt_content)
-
-    # Extract filename without extension
-    filename_without_ext = os.path.basename(args.input).split('.')[0]
-
-    final_html = wrap_html(html_blocks, filename_without_ext)
+    if os.path.isdir(args.input):
+        rendered = build_directory(args.input, args.output, args.processes, args.index, args.force)
+        print(f"{rendered} HTML files generated in: {args.output}")
+        return
 
-    with open(args.output, 'w', encoding='utf-8') as out_file:
-        out_file.write(final_html)
+    render_file(args.input, args.output)
 
     print(f"HTML file generated at: {args.output}")
 
@@ -0,0 +1,125 @@
+import os
+import signal
+import subprocess
+import threading
+from contextlib import contextmanager
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+SIGXCPU = getattr(signal, "SIGXCPU", None)
+
+
+class JobTimeout(subprocess.SubprocessError):
+    """A supervised process ran past its wall-clock or CPU time limit and was killed."""
+
+    def __init__(self, cmd, limit):
+        super().__init__(f"{cmd[0]} exceeded its {limit} and was killed")
+        self.cmd = cmd
+        self.limit = limit
+
+
+class Supervisor:
+    """
+    Starts child processes (whisper, ffmpeg) under limits and keeps track of them.
+
+    Every child runs in a new session, i.e. in a process group of its own, so killing it with
+    os.killpg takes down whatever it spawned and never touches any other process on the machine.
+    wall_seconds kills a child that runs longer than that, cpu_seconds and memory_bytes are
+    applied to the started child with prlimit (RLIMIT_CPU, RLIMIT_AS), so the kernel enforces
+    them. prlimit only exists on Linux, elsewhere just the wall-clock limit holds. A limit of None
+    or 0 is not applied.
+    """
+
+    def __init__(self, wall_seconds=None, cpu_seconds=None, memory_bytes=None):
+        self.wall_seconds = wall_seconds
+        self.cpu_seconds = cpu_seconds
+        self.memory_bytes = memory_bytes
+        self.children = set()
+        self.lock = threading.Lock()
+
+    def _limit(self, process):
+        # Set from here rather than in a preexec_fn, which is not safe to run in a forked copy of
+        # a threaded process. The child has only just started, long before it gets near a limit.
+        if not hasattr(resource, "prlimit"):
+            return
+        if self.cpu_seconds:
+            # The kernel sends SIGXCPU at the soft limit and SIGKILL at the hard one.
+            resource.prlimit(process.pid, resource.RLIMIT_CPU, (self.cpu_seconds, self.cpu_seconds + 5))
+        if self.memory_bytes:
+            resource.prlimit(process.pid, resource.RLIMIT_AS, (self.memory_bytes, self.memory_bytes))
+
+    @contextmanager
+    def popen(self, cmd, **kwargs):
+        """
+        Context manager starting cmd with subprocess.Popen(**kwargs) under the limits. On exit its
+        pipes are closed and the child is waited for; if the block raised, its process group is
+        killed first. JobTimeout is raised when a time limit ended the child.
+        """
+        process = subprocess.Popen(cmd, start_new_session=True, **kwargs)
+        process.timed_out = False
+        try:
+            self._limit(process)
+        except ProcessLookupError:
+            pass  # Already exited.
+        except BaseException:
+            self.kill(process)
+            process.wait()
+            raise
+        with self.lock:
+            self.children.add(process)
+        timer = None
+        if self.wall_seconds:
+            timer = threading.Timer(self.wall_seconds, self._expire, [process])
+            timer.daemon = True
+            timer.start()
+        try:
+            yield process
+        except BaseException:
+            self.kill(process)
+            raise
+        finally:
+            for stream in (process.stdin, process.stdout, process.stderr):
+                if stream:
+                    stream.close()
+            process.wait()
+            if timer:
+                timer.cancel()
+            with self.lock:
+                self.children.discard(process)
+
+        if process.timed_out and process.returncode == -signal.SIGKILL:
+            raise JobTimeout(cmd, f"wall-clock limit of {self.wall_seconds}s")
+        if SIGXCPU and process.returncode == -SIGXCPU:
+            raise JobTimeout(cmd, f"CPU limit of {self.cpu_seconds}s")
+
+    def run(self, cmd, check=True, **kwargs):
+        """
+        Like subprocess.run with stdout and stderr captured in memory. Raises CalledProcessError
+        carrying the captured stderr when check is set and the command fails.
+        """
+        with self.popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, **kwargs) as process:
+            stdout, stderr = process.communicate()
+        if check and process.returncode != 0:
+            raise subprocess.CalledProcessError(process.returncode, cmd, stdout, stderr)
+        return subprocess.CompletedProcess(cmd, process.returncode, stdout, stderr)
+
+    def _expire(self, process):
+        process.timed_out = True
+        self.kill(process)
+
+    def kill(self, process):
+        """Kills the process group of a supervised child."""
+        try:
+            os.killpg(process.pid, signal.SIGKILL)
+        except (ProcessLookupError, PermissionError):
+            pass
+
+    def kill_all(self):
+        """Kills every child still running, e.g. when the pipeline itself is interrupted."""
+        with self.lock:
+            children = list(self.children)
+        for process in children:
+            self.kill(process)
@@ -0,0 +1,103 @@
+import os
+import queue
+import subprocess
+import threading
+import time
+
+
+def available_cores():
+    """Number of cores this process may run on (honours taskset/cgroup affinity where supported)."""
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+
+def split_cores(instances, cores=None):
+    """Splits the cores between recognizer instances as evenly as possible, e.g. 64 cores / 3 -> [22, 21, 21]."""
+    cores = cores or available_cores()
+    instances = max(1, min(instances, cores))
+    base, extra = divmod(cores, instances)
+    return [base + 1 if i < extra else base for i in range(instances)]
+
+
+def probe_duration(audio_filepath):
+    """Returns the duration of an audio file in seconds using ffprobe, or None if it cannot be read."""
+    cmd = [
+        "ffprobe",
+        "-v", "error",
+        "-show_entries", "format=duration",
+        "-of", "default=noprint_wrappers=1:nokey=1",
+        audio_filepath
+    ]
+    try:
+        output = subprocess.run(cmd, capture_output=True, text=True, check=True).stdout.strip()
+        return float(output)
+    except (subprocess.CalledProcessError, FileNotFoundError, ValueError):
+        return None
+
+
+def longest_first(filepaths, durations):
+    """Orders files longest-first so the run does not end waiting on one long straggler.
+    Files with an unknown duration are ordered by size after the known ones."""
+    known = [p for p in filepaths if durations.get(p)]
+    unknown = [p for p in filepaths if not durations.get(p)]
+    return (sorted(known, key=lambda p: durations[p], reverse=True)
+            + sorted(unknown, key=os.path.getsize, reverse=True))
+
+
+def run_scheduled(filepaths, transcribe, instances, cores=None, durations=None, on_done=None):
+    """
+    Runs up to `instances` recognizers at once over filepaths.
+
+    The available cores are split between the instances (see split_cores) and each instance
+    thread calls transcribe(filepath, threads) with its share. Files are handed out longest-first.
+    After each file the realtime factor (wall-clock seconds per second of audio) is reported and
+    on_done(filepath, duration, elapsed) is called. Returns a list of (filepath, duration, elapsed).
+    """
+    if durations is None:
+        durations = {p: probe_duration(p) for p in filepaths}
+    pending = queue.Queue()
+    for filepath in longest_first(filepaths, durations):
+        pending.put(filepath)
+
+    thread_counts = split_cores(instances, cores)
+    print(f"Running {len(thread_counts)} recognizer instances with {thread_counts} threads.")
+    results = []
+    results_lock = threading.Lock()
+
+    def instance(threads):
+        while True:
+            try:
+                filepath = pending.get_nowait()
+            except queue.Empty:
+                return
+            started = time.time()
+            try:
+                transcribe(filepath, threads)
+            except Exception as e:
+                print(f"Error while transcribing {filepath}: {e}. Skipping this file.")
+                continue
+            elapsed = time.time() - started
+            duration = durations.get(filepath)
+            if duration:
+                print(f"{os.path.basename(filepath)}: {duration:.0f}s of audio in {elapsed:.0f}s, "
+                      f"realtime factor {elapsed / duration:.3f} ({threads} threads)")
+            else:
+                print(f"{os.path.basename(filepath)}: transcribed in {elapsed:.0f}s ({threads} threads)")
+            with results_lock:
+                results.append((filepath, duration, elapsed))
+            if on_done:
+                on_done(filepath, duration, elapsed)
+
+    workers = [threading.Thread(target=instance, args=(threads,)) for threads in thread_counts]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+
+    total_audio = sum(d for _, d, _ in results if d)
+    total_elapsed = sum(e for _, d, e in results if d)
+    if total_audio:
+        print(f"Transcribed {total_audio / 3600:.2f} h of audio, mean realtime factor per instance "
+              f"{total_elapsed / total_audio:.3f}.")
+    return results